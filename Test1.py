@@ -1,36 +1,27 @@
-import os
 import pytest
 import warnings
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-from openai import OpenAI
-from ragas import SingleTurnSample
-from ragas.metrics import LLMContextPrecisionWithoutReference
-from ragas.llms import llm_factory
-import requests
-
 # user_input -> query 
 # response -> response
 # reference -> Ground Truth
 # retrieved_context -> Top K retrieved documents
 
 @pytest.mark.asyncio
-async def test_context_precision():
+async def test_context_precision(eval_runtime):
+    # Imported here so collecting the suite does not load ragas/openai
+    from ragas import SingleTurnSample
+    from ragas.metrics import LLMContextPrecisionWithoutReference
 
     # create object of class for specific metric 
-    apikey = os.getenv("OPENAI_API_KEY")
-    if not apikey:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    
     # power of LLM + method metric -> score 
-    client = OpenAI(api_key=apikey)
-    llm = llm_factory("gpt-4o", client=client)
-    context_precision = LLMContextPrecisionWithoutReference(llm=llm)
+    # The session runtime shares one cached, rate-limited judge client across tests
+    context_precision = eval_runtime.metric(LLMContextPrecisionWithoutReference)
     query="How many articles are there in the selenium webdriver python course ?"
 
     # Feed data
-    responseDir = requests.post("https://rahulshettyacademy.com/rag-llm/ask", json = {"question":query,"chat_history":[]} ).json()
+    responseDir = eval_runtime.rag.ask(query)
     print(responseDir)
     
     sample = SingleTurnSample(
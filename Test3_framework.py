@@ -1,30 +1,15 @@
 import pytest
 import warnings
-from ragas import SingleTurnSample
-from ragas.metrics.collections import ContextRecall
 from utils import get_test_parameters, get_llm_response
 
 warnings.filterwarnings("ignore")
 
-@pytest.mark.asyncio
-@pytest.mark.parametrize("getData", get_test_parameters(), indirect=True)
-async def test_context_recall(llm_wrapper, getData):
-    """Test context recall metric for each query"""
-    metric = ContextRecall(llm=llm_wrapper)
-    score = await metric.ascore(
-        user_input=getData.user_input, 
-        retrieved_contexts=getData.retrieved_contexts, 
-        reference=getData.reference
-    )
-    print(f"Context Recall Score: {score}")
-    assert score >= 0
-
 
-@pytest.fixture
-def getData(request):
+def build_sample(params):
     """Fetch data and create SingleTurnSample"""
-    query = request.param["query"]
-    reference = request.param["reference"]
+    from ragas import SingleTurnSample
+    query = params["query"]
+    reference = params["reference"]
     
     response = get_llm_response(query)
     
@@ -33,3 +18,18 @@ def getData(request):
         retrieved_contexts=[doc['page_content'] for doc in response['retrieved_docs']],
         reference=reference
     )
+
+
+def build_metrics(runtime):
+    from ragas.metrics.collections import ContextRecall
+    return [runtime.metric(ContextRecall)]
+
+
+# Every query is scored up front in one concurrent pass (see batch_scoring.py)
+@pytest.mark.batch_score(sample=build_sample, metrics=build_metrics)
+@pytest.mark.parametrize("params", get_test_parameters())
+def test_context_recall(params, scores):
+    """Test context recall metric for each query"""
+    score = scores["context_recall"]
+    print(f"Context Recall Score: {score}")
+    assert score >= 0
@@ -1,8 +1,5 @@
 import pytest
 import json
-from ragas import SingleTurnSample
-from ragas.metrics.collections import Faithfulness
-from utils import get_llm_response
 
 
 def load_json(filepath):
@@ -11,24 +8,9 @@ def load_json(filepath):
         return json.load(f)
 
 
-@pytest.mark.asyncio
-@pytest.mark.parametrize("getData", load_json("testdata/Test4.json"), indirect=True)
-async def test_faithfulness(llm_wrapper, getData):
-    """Test faithfulness metric - measures if response is grounded in context"""
-    faithfulness = Faithfulness(llm=llm_wrapper)
-    score = await faithfulness.ascore(
-        user_input=getData.user_input,
-        response=getData.response,
-        retrieved_contexts=getData.retrieved_contexts
-    )
-    print(f"Faithfulness Score: {score}")
-    assert score >= 0
-
-
-@pytest.fixture
-def getData(request):
+def build_sample(test_data):
     """Prepare test data for faithfulness testing"""
-    test_data = request.param
+    from ragas import SingleTurnSample
     
     # Create sample with user input, response, and retrieved contexts
     sample = SingleTurnSample(
@@ -37,4 +19,19 @@ def getData(request):
         retrieved_contexts=[test_data["context"]]
     )
     
-    return sample
\ No newline at end of file
+    return sample
+
+
+def build_metrics(runtime):
+    from ragas.metrics.collections import Faithfulness
+    return [runtime.metric(Faithfulness)]
+
+
+# Scored together with every other batched test at session start (see batch_scoring.py)
+@pytest.mark.batch_score(sample=build_sample, metrics=build_metrics)
+@pytest.mark.parametrize("test_data", load_json("testdata/Test4.json"))
+def test_faithfulness(test_data, scores):
+    """Test faithfulness metric - measures if response is grounded in context"""
+    score = scores["faithfulness"]
+    print(f"Faithfulness Score: {score}")
+    assert score >= 0
@@ -3,30 +3,11 @@ import warnings
 # Filter specific deprecation warnings from ragas
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="ragas")
 
-from ragas import SingleTurnSample, EvaluationDataset, evaluate
-from ragas.metrics import ResponseRelevancy, FactualCorrectness
-
 from utils import load_test_data, get_llm_response
 
-@pytest.mark.parametrize("getData",
-                         load_test_data("Test5.json"), indirect=True)
-@pytest.mark.asyncio
-@pytest.mark.filterwarnings("ignore::DeprecationWarning")
-async def test_relevancy_factual(llm_wrapper, embedding_wrapper, getData):
-    metrics = [ResponseRelevancy(llm=llm_wrapper, embeddings=embedding_wrapper),
-               FactualCorrectness(llm=llm_wrapper)]
-
-    eval_dataset = EvaluationDataset([getData])
-    results = evaluate(dataset=eval_dataset, metrics=metrics)
-   #results = evaluate(dataset=eval_dataset)
-    print(results)
-    print(results["answer_relevancy"])
-    # results.upload()
 
-
-@pytest.fixture
-def getData(request):
-    test_data = request.param
+def build_sample(test_data):
+    from ragas import SingleTurnSample
     responseDict = get_llm_response(test_data)
     sample = SingleTurnSample(
         user_input=test_data["question"],
@@ -35,4 +16,21 @@ def getData(request):
         reference=test_data["reference"]
 
     )
-    return sample
\ No newline at end of file
+    return sample
+
+
+def build_metrics(runtime):
+    from ragas.metrics import ResponseRelevancy, FactualCorrectness
+    return [runtime.metric(ResponseRelevancy),
+            runtime.metric(FactualCorrectness)]
+
+
+# No per-test evaluate() call: all samples are scored in one concurrent pass (see batch_scoring.py)
+@pytest.mark.batch_score(sample=build_sample, metrics=build_metrics)
+@pytest.mark.parametrize("test_data",
+                         load_test_data("Test5.json"))
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_relevancy_factual(test_data, scores):
+    print(scores)
+    print(scores["answer_relevancy"])
+    # results.upload()
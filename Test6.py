@@ -1,15 +1,13 @@
 import pytest
-from ragas import SingleTurnSample, MultiTurnSample
-from ragas.messages import HumanMessage, AIMessage
-from ragas.metrics import Faithfulness, TopicAdherenceScore
 
 from utils import load_test_data, get_llm_response
 
 
 #@pytest.mark.parametrize("getData", load_test_data("Test4.json"), indirect=True)
 @pytest.mark.asyncio
-async def test_topicAdherence(llm_wrapper, getData):
-    topicScore = TopicAdherenceScore(llm=llm_wrapper)
+async def test_topicAdherence(eval_runtime, getData):
+    from ragas.metrics import TopicAdherenceScore
+    topicScore = eval_runtime.metric(TopicAdherenceScore)
     score = await topicScore.multi_turn_ascore(getData)
     print(score)
     assert score > 0.8
@@ -17,6 +15,8 @@ async def test_topicAdherence(llm_wrapper, getData):
 
 @pytest.fixture
 def getData():
+    from ragas import MultiTurnSample
+    from ragas.messages import HumanMessage, AIMessage
     # test_data = request.param
     # responseDict = get_llm_response(test_data)
     conversation = [
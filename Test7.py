@@ -1,15 +1,13 @@
 import pytest
-from ragas import SingleTurnSample
 import warnings
 
 # Filter deprecation warnings from Ragas
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
-from ragas.metrics import RubricsScore
-
 
 @pytest.mark.asyncio
-async def test_rubric_score(llm_wrapper, getData):
+async def test_rubric_score(eval_runtime, getData):
+    from ragas.metrics import RubricsScore
     rubrics = {
         "score1_description": "The response is incorrect, irrelevant, or does not align with the ground truth.",
         "score2_description": "The response partially matches the ground truth but includes significant errors, omissions, or irrelevant information.",
@@ -18,7 +16,7 @@ async def test_rubric_score(llm_wrapper, getData):
         "score5_description": "The response is fully accurate, aligns completely with the ground truth, and is clear and detailed.",
     }
 
-    rubrics_score = RubricsScore(rubrics=rubrics, llm=llm_wrapper)
+    rubrics_score = eval_runtime.metric(RubricsScore, rubrics=rubrics)
     score = await rubrics_score.single_turn_ascore(getData)
     print(f"Calculated Score: {score}")
     
@@ -28,6 +26,7 @@ async def test_rubric_score(llm_wrapper, getData):
 
 @pytest.fixture
 def getData():
+    from ragas import SingleTurnSample
     sample = SingleTurnSample(
         user_input="Where is the Eiffel Tower located?",
         response="The Eiffel Tower is located in Paris.",
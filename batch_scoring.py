@@ -0,0 +1,145 @@
+"""Pytest plugin: score every (sample, metric) pair the suite needs in one concurrent pass.
+
+Tests opt in with a marker naming how to build their sample and metrics::
+
+    @pytest.mark.batch_score(sample=build_sample, metrics=build_metrics)
+    @pytest.mark.parametrize("test_data", load_test_data("Test5.json"))
+    def test_something(test_data, scores):
+        assert scores["faithfulness"] >= 0
+
+``build_sample(param)`` (sync or async) turns the test's parameter into a
+ragas sample, ``build_metrics(runtime)`` returns the metrics to score it with.
+Once collection is final, the first test that asks for ``scores`` builds every
+sample concurrently and scores all pairs on one EvaluationEngine pool, so the
+suite costs roughly its slowest judge call instead of the sum of all of them.
+
+Under pytest-xdist a worker cannot know which tests it will be sent, so it
+scores one xdist group (see sharding.py) at a time instead of the whole batch.
+"""
+import json
+import asyncio
+import inspect
+
+import pytest
+import pytest_asyncio
+
+BATCH_ITEMS = pytest.StashKey[list]()
+
+# Samples built at once; sync builders (RAG lookups) run in worker threads
+BUILD_CONCURRENCY = 8
+
+
+def pytest_addoption(parser):
+    parser.addoption("--judge-concurrency", type=int, default=16,
+                     help="Max concurrent judge calls in the batched scoring pass")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "batch_score(sample, metrics, param=None): score this test's sample in the session-wide batch")
+
+
+def pytest_collection_finish(session):
+    # After deselection, so -k/-m filtered tests are not scored
+    session.config.stash[BATCH_ITEMS] = [item for item in session.items if item.get_closest_marker("batch_score")]
+
+
+def sample_param(item, name=None):
+    """The parameter a batch_score test builds its sample from"""
+    if name is None:
+        name = item.get_closest_marker("batch_score").kwargs.get("param")
+    params = item.callspec.params if hasattr(item, "callspec") else {}
+    if name is None:
+        if len(params) != 1:
+            raise pytest.UsageError(f"{item.nodeid}: batch_score needs param= when a test has {len(params)} parameters")
+        name = next(iter(params))
+    return params[name]
+
+
+async def _build(item, semaphore):
+    marker = item.get_closest_marker("batch_score")
+    builder = marker.kwargs["sample"]
+    param = sample_param(item)
+    async with semaphore:
+        if inspect.iscoroutinefunction(builder):
+            return await builder(param)
+        return await asyncio.to_thread(builder, param)
+
+
+async def score_items(items, runtime, max_concurrency=16):
+    """{nodeid: {metric name: score} or the exception raised while building its sample}"""
+    from evaluation.engine import EvaluationEngine
+
+    semaphore = asyncio.Semaphore(BUILD_CONCURRENCY)
+    samples = await asyncio.gather(*(_build(item, semaphore) for item in items), return_exceptions=True)
+
+    requested = {}
+    metrics = {}
+    for item in items:
+        requested[item.nodeid] = item.get_closest_marker("batch_score").kwargs["metrics"](runtime)
+        for metric in requested[item.nodeid]:
+            metrics[id(metric)] = metric
+    engine = EvaluationEngine(list(metrics.values()), max_concurrency=max_concurrency)
+
+    # Identical (sample, metric) pairs from different tests are scored once
+    jobs = {}
+    for item, sample in zip(items, samples):
+        if isinstance(sample, Exception):
+            continue
+        sample_key = json.dumps(sample.to_dict(), sort_keys=True, default=str)
+        for metric in requested[item.nodeid]:
+            jobs.setdefault((sample_key, id(metric)), (None, sample, metric))
+    keys = list(jobs)
+    scores = dict(zip(keys, await engine.run_jobs([jobs[k] for k in keys])))
+
+    results = {}
+    for item, sample in zip(items, samples):
+        if isinstance(sample, Exception):
+            results[item.nodeid] = sample
+            continue
+        sample_key = json.dumps(sample.to_dict(), sort_keys=True, default=str)
+        results[item.nodeid] = {m.name: scores[(sample_key, id(m))] for m in requested[item.nodeid]}
+    return results
+
+
+def _group(item):
+    marker = item.get_closest_marker("xdist_group")
+    return marker.args[0] if marker and marker.args else item.nodeid
+
+
+class BatchScores:
+    """Scores for the session's batch_score tests, computed on first request"""
+
+    def __init__(self, items, runtime, max_concurrency=16, per_group=False):
+        self.items = items
+        self.runtime = runtime
+        self.max_concurrency = max_concurrency
+        self.per_group = per_group
+        self.results = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, item):
+        async with self._lock:
+            if item.nodeid not in self.results:
+                pending = [i for i in self.items if i.nodeid not in self.results
+                           and (not self.per_group or _group(i) == _group(item))]
+                self.results.update(await score_items(pending, self.runtime, self.max_concurrency))
+        return self.results[item.nodeid]
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def batch_scores(request, eval_runtime):
+    config = request.config
+    return BatchScores(config.stash.get(BATCH_ITEMS, []), eval_runtime, config.getoption("--judge-concurrency"),
+                       per_group=hasattr(config, "workerinput"))
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def scores(request, batch_scores):
+    """This test's precomputed {metric name: score}"""
+    if request.node.get_closest_marker("batch_score") is None:
+        raise pytest.UsageError(f"{request.node.nodeid} uses `scores` without a batch_score marker")
+    result = await batch_scores.get(request.node)
+    if isinstance(result, Exception):
+        raise result
+    return result
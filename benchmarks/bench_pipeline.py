@@ -0,0 +1,210 @@
+"""Throughput benchmark for the evaluation pipeline.
+
+Runs the same stages as evaluation/run_eval.py (load -> score -> write)
+against synthetic datasets, with the RAG endpoint and OpenAI replaced by
+the in-process stand-ins from local_servers.py. Each size runs in its own
+subprocess so peak RSS is measured per size.
+
+    python benchmarks/bench_pipeline.py                      # 10, 100, 1k, 10k samples
+    python benchmarks/bench_pipeline.py --sizes 10 100       # quick run
+    python benchmarks/bench_pipeline.py --compare OLD.json NEW.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+RESULT_MARKER = "BENCH_RESULT "
+
+
+def synthetic_items(size, multi_turn_ratio=0.1):
+    """Test5/Test6-shaped raw items; single-turn ones still need a RAG fetch"""
+    from utils import load_test_data
+
+    conversation = load_test_data("Test6.json")[0]
+    n_multi = int(size * multi_turn_ratio)
+    single = [
+        {
+            "question": f"How many articles are there in course number {i}?",
+            "reference": f"Course {i} has {i % 40} articles.",
+        }
+        for i in range(size - n_multi)
+    ]
+    multi = []
+    for i in range(n_multi):
+        turns = [dict(turn, content=f"{turn['content']} (#{i})") for turn in conversation["conversation"]]
+        multi.append({"conversation": turns, "reference_topics": conversation["reference_topics"]})
+    return single, multi
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_one(size, concurrency, llm_latency_ms, rag_latency_ms, judge_concurrency=16):
+    """Benchmark a single dataset size in this process"""
+    from local_servers import LocalStack
+
+    stack = LocalStack(latency_ms=rag_latency_ms, llm_latency_ms=llm_latency_ms)
+    os.environ.update(stack.env())
+
+    from evaluation.run_eval import build_metrics, load_samples, score_samples, write_results
+
+    single, multi = synthetic_items(size)
+    metrics = build_metrics(os.environ["OPENAI_API_KEY"])
+    stages = {}
+
+    start = time.perf_counter()
+    samples = asyncio.run(load_samples(single, multi, concurrency=concurrency))
+    stages["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = asyncio.run(score_samples(samples, metrics, max_concurrency=judge_concurrency))
+    stages["score"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as results_dir:
+        start = time.perf_counter()
+        write_results(df, len(samples), results_dir=results_dir)
+        stages["write"] = time.perf_counter() - start
+
+    stack.stop()
+    total = sum(stages.values())
+    llm_calls = stack.openai.stats.get("chat", 0)
+    return {
+        "size": size,
+        "samples": len(samples),
+        "stages_s": stages,
+        "total_s": total,
+        "samples_per_sec": len(samples) / total if total else None,
+        "score_samples_per_sec": len(samples) / stages["score"] if stages["score"] else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "llm_calls": llm_calls,
+        "llm_calls_per_sample": llm_calls / len(samples) if samples else None,
+        "embedding_requests": stack.openai.stats.get("embeddings", 0),
+        "rag_requests": stack.rag.stats.get("ask", 0),
+        "prompt_tokens": stack.openai.stats.get("prompt_tokens", 0),
+        "completion_tokens": stack.openai.stats.get("completion_tokens", 0),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(sizes, concurrency, llm_latency_ms, rag_latency_ms, with_cache, judge_concurrency=16):
+    env = dict(os.environ)
+    if not with_cache:
+        # Measure the pipeline, not the on-disk caches
+        env["RAGAS_CACHE"] = "off"
+    env.pop("RAG_CASSETTE", None)
+    # ragas usage telemetry makes a network call per evaluate(); keep it out of the numbers
+    env["RAGAS_DO_NOT_TRACK"] = "true"
+    # Keep the rate limiter's bookkeeping in the measurement but not a real account's quota
+    env.setdefault("RAGAS_RPM_LIMIT", "1000000")
+    env.setdefault("RAGAS_TPM_LIMIT", "1000000000")
+
+    results = []
+    for size in sizes:
+        print(f"⏱️ Benchmarking {size} samples...")
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(size),
+               "--concurrency", str(concurrency), "--llm-latency-ms", str(llm_latency_ms),
+               "--rag-latency-ms", str(rag_latency_ms), "--judge-concurrency", str(judge_concurrency)]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=ROOT)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_MARKER)]
+        if proc.returncode != 0 or not lines:
+            print(f"❌ size={size} failed:\n{proc.stderr[-2000:]}")
+            results.append({"size": size, "error": proc.stderr[-2000:]})
+            continue
+        result = json.loads(lines[-1][len(RESULT_MARKER):])
+        results.append(result)
+        print(f"   {result['samples_per_sec']:.1f} samples/s | "
+              f"load {result['stages_s']['load']:.2f}s, score {result['stages_s']['score']:.2f}s, "
+              f"write {result['stages_s']['write']:.2f}s | peak RSS {result['peak_rss_mb']:.0f} MB | "
+              f"{result['llm_calls_per_sample']:.1f} LLM calls/sample")
+
+    import ragas
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "ragas": ragas.__version__,
+        "platform": platform.platform(),
+        "config": {
+            "concurrency": concurrency,
+            "judge_concurrency": judge_concurrency,
+            "llm_latency_ms": llm_latency_ms,
+            "rag_latency_ms": rag_latency_ms,
+            "with_cache": with_cache,
+        },
+        "results": results,
+    }
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{report['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"💾 Saved benchmark results to {path}")
+    return report
+
+
+def compare(base_path, head_path):
+    """Print per-size throughput and stage deltas between two result files"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    base_by_size = {r["size"]: r for r in base["results"] if "error" not in r}
+
+    print(f"{'size':>7} {'base/s':>10} {'head/s':>10} {'change':>8}  stages (head - base, s)")
+    for r in head["results"]:
+        b = base_by_size.get(r["size"])
+        if b is None or "error" in r:
+            continue
+        change = (r["samples_per_sec"] / b["samples_per_sec"] - 1) * 100
+        stage_deltas = ", ".join(f"{k} {r['stages_s'][k] - b['stages_s'][k]:+.2f}" for k in r["stages_s"])
+        print(f"{r['size']:>7} {b['samples_per_sec']:>10.1f} {r['samples_per_sec']:>10.1f} {change:>+7.1f}%  {stage_deltas}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation pipeline against local stand-ins")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--concurrency", type=int, default=8, help="RAG fetch concurrency")
+    parser.add_argument("--judge-concurrency", type=int, default=16, help="Max concurrent metric jobs")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated OpenAI latency")
+    parser.add_argument("--rag-latency-ms", type=float, default=0, help="Simulated /ask latency")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the judge/embedding caches enabled")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two saved result files")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if args.worker is not None:
+        result = run_one(args.worker, args.concurrency, args.llm_latency_ms, args.rag_latency_ms, args.judge_concurrency)
+        print(RESULT_MARKER + json.dumps(result))
+        return 0
+    run_suite(args.sizes, args.concurrency, args.llm_latency_ms, args.rag_latency_ms, args.with_cache,
+              args.judge_concurrency)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
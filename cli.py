@@ -0,0 +1,102 @@
+"""Single entry point: python cli.py {eval,gen,compare,dashboard} [args]
+
+Only the standard library is imported up front; each subcommand imports
+what it needs when it runs, so `--help` returns immediately. Pass
+--import-times to see how long each deferred import took.
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+
+_START = time.perf_counter()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Heavy dependencies each subcommand pulls in, imported (and timed) in this order
+SUBCOMMAND_IMPORTS = {
+    "eval": ["numpy", "pandas", "httpx", "openai", "pyarrow", "langchain_openai", "ragas", "ragas.metrics",
+             "evaluation.run_eval"],
+    "gen": ["numpy", "langchain_openai", "ragas", "ragas.testset", "nltk", "testDataFeaxtory"],
+    "compare": ["numpy", "pandas", "pyarrow", "evaluation.compare"],
+    "dashboard": [],
+}
+
+IMPORT_TIMES = []
+
+
+def load(name):
+    """Import a module, recording how long it took if it was not loaded yet"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.append((name, time.perf_counter() - start))
+    return module
+
+
+def report_import_times(startup):
+    print(f"⏱️ CLI startup: {startup * 1000:.0f} ms")
+    for name, seconds in IMPORT_TIMES:
+        print(f"   {name:<24} {seconds * 1000:8.0f} ms")
+    print(f"   {'total deferred':<24} {sum(s for _, s in IMPORT_TIMES) * 1000:8.0f} ms")
+
+
+def run_eval(args):
+    load("evaluation.run_eval").cli(args.args)
+
+
+def run_gen(args):
+    load("testDataFeaxtory").generate_testset(args.size, rebuild=args.rebuild)
+
+
+def run_compare(args):
+    load("evaluation.compare").main(args.args)
+
+
+def run_dashboard(args):
+    import subprocess
+    app = os.path.join(BASE_DIR, "dashboard", "app.py")
+    subprocess.run([sys.executable, "-m", "streamlit", "run", app, *args.args], check=False)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Ragas LLM evaluation toolkit")
+    parser.add_argument("--import-times", action="store_true", help="Report the time spent importing each dependency")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    # eval/compare/dashboard forward their options (and --help) to the underlying parser
+    p = sub.add_parser("eval", help="Run the evaluation suite (options as in evaluation/run_eval.py)", add_help=False)
+    p.set_defaults(func=run_eval, forward=True)
+
+    p = sub.add_parser("gen", help="Generate a synthetic testset from fs11/")
+    p.add_argument("size", type=int, nargs="?", default=20, help="Number of test questions")
+    p.add_argument("--rebuild", action="store_true", help="Discard the persisted knowledge graph")
+    p.set_defaults(func=run_gen)
+
+    p = sub.add_parser("compare", help="Paired comparison of two runs (options as in evaluation/compare.py)", add_help=False)
+    p.set_defaults(func=run_compare, forward=True)
+
+    p = sub.add_parser("dashboard", help="Launch the Streamlit dashboard (extra options go to streamlit)", add_help=False)
+    p.set_defaults(func=run_dashboard, forward=True)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and not getattr(args, "forward", False):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    startup = time.perf_counter() - _START
+    sys.path.insert(0, BASE_DIR)
+    if args.import_times:
+        for name in SUBCOMMAND_IMPORTS[args.command]:
+            load(name)
+        report_import_times(startup)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,35 @@
 import os
 import pytest
+import pytest_asyncio
 import warnings
-from ragas import SingleTurnSample
-from ragas.metrics.collections import ContextRecall
-from ragas.llms import llm_factory
-from openai import AsyncOpenAI
-import requests
-
-@pytest.fixture
-def llm_wrapper():
-    apikey = os.getenv("OPENAI_API_KEY")
-    if not apikey:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    
-    client = AsyncOpenAI(api_key=apikey)
-    llm = llm_factory("gpt-4o", client=client)
-    return llm
+
+# Session-wide batched scoring for tests marked with batch_score, and
+# pytest-xdist sharding with a run-wide RAG answer cache
+pytest_plugins = ["batch_scoring", "sharding"]
 
 
-@pytest.fixture
-def embedding_wrapper():
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def eval_runtime():
+    """One pooled OpenAI client, judge cache, rate limiter and metric set for the whole session"""
     apikey = os.getenv("OPENAI_API_KEY")
     if not apikey:
         raise ValueError("OPENAI_API_KEY environment variable not set")
-    
-    client = AsyncOpenAI(api_key=apikey)
-    # Import locally to avoid top-level deprecated import warnings if possible, 
-    # or just use the one from ragas.embeddings.base
-    from ragas.embeddings import OpenAIEmbeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", client=client)
-    return embeddings
-    
+    # ragas/openai are imported on first use so test collection stays fast
+    from runtime import EvalRuntime
+
+    # Judge calls go through the on-disk verdict cache (see llm_cache.py)
+    # and the process-wide rate limiter (see rate_limiter.py)
+    runtime = EvalRuntime(api_key=apikey)
+    yield runtime
+    await runtime.aclose()
+
+
+@pytest.fixture(scope="session")
+def llm_wrapper(eval_runtime):
+    return eval_runtime.llm()
+
 
+@pytest.fixture(scope="session")
+def embedding_wrapper(eval_runtime):
+    # Vectors are served from the memory-mapped store on repeat runs
+    return eval_runtime.embeddings()
@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-import glob
-import json
+import numpy as np
 import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_store import ResultsStore, SummaryIndex, metric_aggregates
+from evaluation.compare import compare_runs
+
 # ===============================
 # Configuration & Styles
 # ===============================
@@ -152,29 +155,205 @@ st.markdown("""
 # ===============================
 # Data Logic
 # ===============================
-@st.cache_data
-def load_data():
-    RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results")
-    
-    # Load summaries
-    summary_files = glob.glob(os.path.join(RESULTS_DIR, "*_summary.json"))
-    history = []
-    
-    for f in summary_files:
-        try:
-            with open(f, 'r') as file:
-                data = json.load(file)
-                history.append(data)
-        except Exception:
-            pass
-            
-    if not history:
-        return pd.DataFrame(), pd.DataFrame(), RESULTS_DIR
-        
-    history_df = pd.DataFrame(history).sort_values("timestamp", ascending=True)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results")
+
+
+@st.cache_resource
+def get_store():
+    return ResultsStore(os.path.join(RESULTS_DIR, "store"))
+
+
+@st.cache_resource
+def get_summary_index():
+    # Lives across reruns and sessions; refresh() only stats files and parses what changed
+    return SummaryIndex(RESULTS_DIR)
+
+
+def history_version():
+    """Cheap per-rerun key that changes whenever any run is added or modified"""
+    index = get_summary_index()
+    index.refresh()
+    return f"{index.version}-{get_store().history_stamp()}"
+
+
+@st.cache_data(max_entries=4)
+def load_data(version):
+    # `version` only keys the cache: a new run means a new version and one rebuild
+    history_df = get_store().history()
+
+    # Runs that only exist as summary JSON (written before the store, or committed by CI)
+    known = set(history_df["run_id"]) if not history_df.empty else set()
+    legacy = [s for s in get_summary_index().summaries() if s.get("run_id") not in known]
+    if legacy:
+        history_df = pd.concat([history_df, pd.DataFrame(legacy)], ignore_index=True)
+
+    if history_df.empty:
+        return pd.DataFrame(), RESULTS_DIR
+
+    history_df = history_df.sort_values("timestamp", ascending=True, ignore_index=True)
     return history_df, RESULTS_DIR
 
-history_df, RESULTS_DIR = load_data()
+
+# Long per-sample text lists; only loaded for the row being inspected
+HEAVY_COLUMNS = ("retrieved_contexts", "reference_contexts", "reference_topics")
+TRACE_TEXT_CHARS = 160
+TRACE_PAGE_SIZES = [25, 50, 100]
+
+
+def _run_id_from_path(path):
+    return os.path.basename(path).split("=", 1)[1]
+
+
+@st.cache_data(max_entries=32)
+def load_details(path, mtime_ns):
+    """Per-run detail frame without the heavy context columns, cached by source path + mtime"""
+    if path.endswith(".csv"):
+        return pd.read_csv(path, usecols=lambda c: c not in HEAVY_COLUMNS)
+    run_id = _run_id_from_path(path)
+    columns = [c for c in get_store().detail_columns(run_id) if c not in HEAVY_COLUMNS]
+    return get_store().details(run_id, columns=columns)
+
+
+@st.cache_data(max_entries=256)
+def load_heavy_columns(path, mtime_ns, position, sample_id=None):
+    """Context columns of a single row: a filtered Parquet read, or a CSV read that stops at that row"""
+    if path.endswith(".csv"):
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [c for c in HEAVY_COLUMNS if c in header]
+        # Parse records rather than skip lines: contexts contain quoted newlines
+        row = pd.read_csv(path, usecols=usecols, nrows=position + 1).iloc[[position]]
+    else:
+        run_id = _run_id_from_path(path)
+        usecols = [c for c in HEAVY_COLUMNS if c in get_store().detail_columns(run_id)]
+        row = get_store().sample_rows(run_id, [sample_id], columns=usecols)
+    return row.iloc[0].to_dict() if not row.empty else {}
+
+
+@st.cache_data(max_entries=64)
+def worst_positions(path, mtime_ns, metric, k):
+    """Row positions of the k lowest scores: O(n) argpartition, then a sort of just those k"""
+    details_df = load_details(path, mtime_ns)
+    if metric not in details_df.columns:
+        return []
+    values = details_df[metric].to_numpy(dtype=float)
+    candidates = np.flatnonzero(~np.isnan(values))
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(values[candidates], k)[:k]]
+    return candidates[np.argsort(values[candidates], kind="stable")].tolist()
+
+
+def truncate_text(df, limit=TRACE_TEXT_CHARS):
+    """Shorten long text cells so a page stays a small payload"""
+    df = df.copy()
+    for column in [c for c in df.columns if df[c].dtype == object or pd.api.types.is_string_dtype(df[c])]:
+        df[column] = df[column].map(lambda v: v[:limit] + "…" if isinstance(v, str) and len(v) > limit else v)
+    return df
+
+
+def render_context(source, position, row, key):
+    """Show a row's retrieved context, loaded from disk only on request"""
+    if st.toggle("Load retrieved context", key=f"{key}_toggle"):
+        heavy = load_heavy_columns(*source, position, row.get("sample_id"))
+        st.text_area("Context", value=str(heavy.get("retrieved_contexts")), height=200, disabled=True, key=key)
+
+
+def details_source(run_id):
+    """(path, mtime_ns) of a run's detail data, preferring the columnar store; None if missing"""
+    store = get_store()
+    if store.has_details(run_id):
+        return store.run_dir(run_id), store.details_stamp(run_id)
+    csv_path = os.path.join(RESULTS_DIR, f"{run_id}_details.csv")
+    if os.path.exists(csv_path):
+        return csv_path, os.stat(csv_path).st_mtime_ns
+    return None
+
+# Trend charts above this many runs are LTTB-downsampled to it
+TREND_MAX_POINTS = 300
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of n_out points that keep the visual shape of (x, y)"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    picked = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked.append(a)
+    picked.append(n - 1)
+    return np.array(picked)
+
+
+@st.cache_data(max_entries=64)
+def trend_series(version, metric, max_points=TREND_MAX_POINTS):
+    """(timestamps, values) of one metric across runs, downsampled once per history version"""
+    df = load_data(version)[0][["timestamp", metric]].dropna()
+    x = pd.to_datetime(df["timestamp"], format="ISO8601").to_numpy()
+    y = df[metric].to_numpy(dtype=float)
+    keep = lttb(x.astype("int64").astype(float), y, max_points)
+    return x[keep], y[keep]
+
+
+@st.cache_data(max_entries=16)
+def history_means(version, metrics):
+    return load_data(version)[0][list(metrics)].mean()
+
+
+@st.cache_data(max_entries=32)
+def run_distribution(path, mtime_ns, run_id):
+    """Per-metric box-plot statistics: precomputed by run_eval, or derived once for legacy runs"""
+    aggregates = get_store().aggregates(run_id)
+    if not aggregates.empty:
+        return aggregates.set_index("metric")
+    details_df = load_details(path, mtime_ns)
+    metrics = [c for c in details_df.select_dtypes("number").columns if c != "run_id"]
+    return pd.DataFrame([dict(metric=m, **metric_aggregates(details_df[m])) for m in metrics]).set_index("metric")
+
+
+@st.cache_data(max_entries=16)
+def paired_comparison(base_source, comp_source, metrics):
+    """Paired per-sample deltas with bootstrap CIs; None when either run predates sample IDs"""
+    base_df = load_details(*base_source)
+    comp_df = load_details(*comp_source)
+    if "sample_id" not in base_df.columns or "sample_id" not in comp_df.columns:
+        return None
+    return compare_runs(base_df, comp_df, list(metrics))
+
+
+@st.cache_data(max_entries=4)
+def cost_history(version):
+    """Per-(run, metric) cost/latency rows with run timestamps, oldest run first"""
+    costs = get_store().cost_latency()
+    if costs.empty:
+        return costs
+    runs = load_data(version)[0][["run_id", "timestamp"]]
+    return costs.merge(runs, on="run_id").sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+@st.cache_data(max_entries=16)
+def costliest_samples(version, run_id, source, k=10):
+    """The k most expensive samples of a run, with their questions when details exist"""
+    costs = get_store().sample_costs(run_id)
+    if costs.empty:
+        return costs
+    top = costs.nlargest(k, "cost_usd")
+    if source is not None:
+        details_df = load_details(*source)
+        if "sample_id" in details_df.columns:
+            questions = details_df.drop_duplicates("sample_id").set_index("sample_id")["user_input"]
+            top.insert(2, "user_input", top["sample_id"].map(questions).map(lambda v: str(v)[:80]))
+    return top.drop(columns="run_id")
+
+
+HISTORY_VERSION = history_version()
+history_df, RESULTS_DIR = load_data(HISTORY_VERSION)
 
 # ===============================
 # Helper Functions
@@ -214,7 +393,8 @@ with st.sidebar:
     st.markdown("---")
     st.caption("⚙️ CONFIGURATION")
     
-    metric_cols = [c for c in history_df.columns if c not in ["run_id", "timestamp", "total_samples", "commit"] and not c.startswith("Unnamed")] if not history_df.empty else []
+    # Numeric columns only: summaries also carry nested sections such as cost_latency
+    metric_cols = [c for c in history_df.columns if c not in ["run_id", "timestamp", "total_samples", "skipped", "commit"] and not c.startswith("Unnamed") and pd.api.types.is_numeric_dtype(history_df[c])] if not history_df.empty else []
     
     selected_metrics = st.multiselect(
         "Active Metrics",
@@ -345,7 +525,7 @@ for i, metric in enumerate(selected_metrics):
 st.markdown("<br>", unsafe_allow_html=True)
 
 # 3. Main Content
-tab_main, tab_dive, tab_comp = st.tabs(["📈 Velocity & Trends", "🔬 Failure Analysis", "⚔️ Model Comparison"])
+tab_main, tab_dive, tab_comp, tab_cost = st.tabs(["📈 Velocity & Trends", "🔬 Failure Analysis", "⚔️ Model Comparison", "💸 Cost & Latency"])
 
 with tab_main:
     st.markdown("#### Evaluation Velocity")
@@ -358,9 +538,10 @@ with tab_main:
         
         for idx, metric in enumerate(selected_metrics):
             color = colors[idx % len(colors)]
+            trend_x, trend_y = trend_series(HISTORY_VERSION, metric)
             fig.add_trace(go.Scatter(
-                x=history_df['timestamp'],
-                y=history_df[metric],
+                x=trend_x,
+                y=trend_y,
                 mode='lines+markers',
                 name=metric.replace("_", " ").title(),
                 line=dict(color=color, width=3, shape='spline'),
@@ -395,7 +576,7 @@ with tab_main:
         st.markdown("#### Aggregated Score Distribution")
         if selected_metrics:
             # Radar chart of latest run vs average
-            avg_scores = history_df[selected_metrics].mean()
+            avg_scores = history_means(HISTORY_VERSION, tuple(selected_metrics))
             latest_scores = history_df.iloc[-1][selected_metrics]
             
             fig_rad = go.Figure()
@@ -430,10 +611,10 @@ with tab_dive:
     with col_sel:
         run_id_select = st.selectbox("Select Run ID", history_df["run_id"].unique(), index=len(history_df)-1)
     
-    details_path = os.path.join(RESULTS_DIR, f"{run_id_select}_details.csv")
+    details_source_stamp = details_source(run_id_select)
     
-    if os.path.exists(details_path):
-        details_df = pd.read_csv(details_path)
+    if details_source_stamp is not None:
+        details_df = load_details(*details_source_stamp)
         
         # Breakdown
         col_dist, col_worst = st.columns([1, 2])
@@ -441,11 +622,16 @@ with tab_dive:
         with col_dist:
              st.markdown("**Score Distribution**")
              if selected_metrics:
-                dist_fig = px.box(
-                    details_df, 
-                    y=selected_metrics,
-                    color_discrete_sequence=["#8b5cf6"]
-                )
+                # Drawn from precomputed quartiles, not by shipping every score to the browser
+                dist = run_distribution(*details_source_stamp, run_id_select)
+                dist = dist.loc[[m for m in selected_metrics if m in dist.index and dist.loc[m, "count"]]]
+                dist_fig = go.Figure(go.Box(
+                    x=dist.index.tolist(),
+                    q1=dist["p25"], median=dist["p50"], q3=dist["p75"],
+                    lowerfence=dist["min"], upperfence=dist["max"], mean=dist["mean"],
+                    marker_color="#8b5cf6",
+                    showlegend=False
+                ))
                 dist_fig.update_layout(
                     template="plotly_dark",
                     paper_bgcolor="rgba(0,0,0,0)",
@@ -459,9 +645,9 @@ with tab_dive:
             st.markdown("**🚨 Critical Failures (Top 3)**")
             if selected_metrics:
                 sort_metric = st.selectbox("Sort failures by:", options=selected_metrics, key="failure_sort")
-                bad_examples = details_df.sort_values(sort_metric, ascending=True).head(3)
                 
-                for i, row in bad_examples.iterrows():
+                for pos in worst_positions(*details_source_stamp, sort_metric, 3):
+                     row = details_df.iloc[pos]
                      with st.expander(f"🔴 Score: {row[sort_metric]:.2f} | Q: {str(row['user_input'])[:60]}..."):
                         c1, c2 = st.columns(2)
                         with c1:
@@ -473,11 +659,45 @@ with tab_dive:
                             st.caption("Reference Truth")
                             st.success(row['reference'])
                             st.caption("Retrieved Context")
-                            st.text_area("Context", value=str(row['retrieved_contexts'])[:400] + "...", height=100, disabled=True)
+                            render_context(details_source_stamp, pos, row, key=f"failure_ctx_{pos}")
 
         st.markdown("---")
         st.markdown("**Full Trace Data**")
-        st.dataframe(details_df, use_container_width=True)
+
+        # Server-side pagination: only one page of truncated rows is sent to the browser
+        c_size, c_page, c_info = st.columns([1, 1, 2])
+        with c_size:
+            page_size = st.selectbox("Rows per page", TRACE_PAGE_SIZES, key="trace_page_size")
+        n_pages = max(1, -(-len(details_df) // page_size))
+        with c_page:
+            page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key="trace_page")
+        start = (page - 1) * page_size
+        page_df = details_df.iloc[start:start + page_size]
+        with c_info:
+            st.caption(f"Rows {start + 1}–{start + len(page_df)} of {len(details_df)} · select a row to inspect it")
+
+        trace_event = st.dataframe(
+            truncate_text(page_df),
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="trace_table"
+        )
+        if trace_event.selection.rows:
+            pos = start + trace_event.selection.rows[0]
+            row = details_df.iloc[pos]
+            with st.container(border=True):
+                c1, c2 = st.columns(2)
+                with c1:
+                    st.caption("Prompt / Query")
+                    st.info(row['user_input'])
+                    st.caption("Model Response")
+                    st.warning(row.get('response'))
+                with c2:
+                    st.caption("Scores")
+                    st.dataframe(row[[m for m in metric_cols if m in row.index]].to_frame("score"), use_container_width=True)
+                    st.caption("Retrieved Context")
+                    render_context(details_source_stamp, pos, row, key=f"trace_ctx_{pos}")
     else:
         st.warning("No detailed trace logs available for this run.")
 
@@ -503,7 +723,47 @@ with tab_comp:
         with d_cols[i]:
             render_metric_card(m.replace("_", " "), f"{comp_val:.3f}", delta=diff, delta_text="vs Base")
 
-    # 2. Side by Side Chart
+    # 2. Paired Significance
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("##### 🎯 Paired Per-Sample Deltas")
+    base_source = details_source(base_run)
+    comp_source = details_source(comp_run)
+    paired = None
+    if base_source and comp_source and base_run != comp_run:
+        paired = paired_comparison(base_source, comp_source, tuple(selected_metrics))
+    if paired is not None:
+        paired = paired[paired["n_pairs"] > 0]
+    if paired is None or paired.empty:
+        st.info("Paired comparison needs two different runs with per-sample results sharing sample IDs.")
+    else:
+        fig_paired = go.Figure(go.Scatter(
+            x=paired["mean_delta"],
+            y=paired["metric"],
+            mode="markers",
+            marker=dict(size=12, color=np.where(paired["significant"], "#6366f1", "#94a3b8")),
+            error_x=dict(
+                type="data",
+                symmetric=False,
+                array=paired["ci_high"] - paired["mean_delta"],
+                arrayminus=paired["mean_delta"] - paired["ci_low"]
+            )
+        ))
+        fig_paired.add_vline(x=0, line_dash="dash", line_color="#64748b")
+        fig_paired.update_layout(
+            template="plotly_dark",
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+            xaxis_title="Challenger - Base (95% bootstrap CI)",
+            height=120 + 50 * len(paired)
+        )
+        st.plotly_chart(fig_paired, use_container_width=True)
+        st.dataframe(
+            paired.rename(columns={"n_pairs": "pairs", "mean_delta": "Δ mean", "ci_low": "CI low", "ci_high": "CI high"}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    # 3. Side by Side Chart
     st.markdown("<br>", unsafe_allow_html=True)
     categories = selected_metrics
     val_base = [run_base_data[m] for m in categories]
@@ -531,3 +791,84 @@ with tab_comp:
          height=400
     )
     st.plotly_chart(fig_comp, use_container_width=True)
+
+with tab_cost:
+    st.markdown("#### 💸 Judge Cost & Latency")
+    costs = cost_history(HISTORY_VERSION)
+
+    if costs.empty:
+        st.info("No cost data yet: runs recorded by `evaluation/run_eval.py` include per-metric latency, tokens and cost.")
+    else:
+        cost_runs = costs["run_id"].unique().tolist()
+        cost_run = st.selectbox("Select Run ID", cost_runs, index=len(cost_runs) - 1, key="cost_run")
+        run_costs = costs[costs["run_id"] == cost_run]
+
+        # 1. Run KPIs
+        k_cols = st.columns(5)
+        with k_cols[0]:
+            render_metric_card("Estimated Cost", f"${run_costs['cost_usd'].sum():.4f}")
+        with k_cols[1]:
+            tokens = int(run_costs["prompt_tokens"].sum() + run_costs["completion_tokens"].sum())
+            render_metric_card("Tokens", f"{tokens:,}")
+        with k_cols[2]:
+            served = run_costs["cache_hits"].sum() + run_costs["cache_misses"].sum()
+            render_metric_card("Cache Hit Rate", f"{run_costs['cache_hits'].sum() / served:.0%}" if served else "–")
+        with k_cols[3]:
+            # Older runs predate the reuse count
+            reused = int(run_costs["reused"].sum()) if "reused" in run_costs.columns else 0
+            render_metric_card("Reused Scores", f"{reused:,}")
+        with k_cols[4]:
+            # No latency when every score of the run was reused
+            if run_costs["p95_latency_s"].notna().any():
+                slowest = run_costs.loc[run_costs["p95_latency_s"].idxmax()]
+                render_metric_card(f"Slowest: {slowest['metric'].replace('_', ' ')}", f"{slowest['p95_latency_s']:.2f}s p95")
+            else:
+                render_metric_card("Slowest", "–")
+
+        st.markdown("<br>", unsafe_allow_html=True)
+        c1, c2 = st.columns(2)
+
+        # 2. Spend per run, stacked by metric
+        with c1:
+            st.markdown("**Cost per Run**")
+            fig_cost = go.Figure()
+            for metric, group in costs.groupby("metric", sort=False):
+                fig_cost.add_trace(go.Bar(x=group["run_id"], y=group["cost_usd"], name=metric.replace("_", " ")))
+            fig_cost.update_layout(
+                template="plotly_dark",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                barmode="stack",
+                height=350,
+                yaxis_title="USD",
+                legend=dict(orientation="h", y=1.15, x=0)
+            )
+            st.plotly_chart(fig_cost, use_container_width=True)
+
+        # 3. p95 job latency per metric across runs
+        with c2:
+            st.markdown("**p95 Latency per Metric**")
+            fig_lat = go.Figure()
+            for metric, group in costs.groupby("metric", sort=False):
+                fig_lat.add_trace(go.Scatter(x=group["run_id"], y=group["p95_latency_s"], mode="lines+markers",
+                                             name=metric.replace("_", " ")))
+            fig_lat.update_layout(
+                template="plotly_dark",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                height=350,
+                yaxis_title="seconds",
+                legend=dict(orientation="h", y=1.15, x=0)
+            )
+            st.plotly_chart(fig_lat, use_container_width=True)
+
+        # 4. Breakdown of the selected run
+        st.markdown("**Per-Metric Breakdown**")
+        st.dataframe(
+            run_costs.drop(columns=["run_id", "timestamp"]).sort_values("cost_usd", ascending=False),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.markdown("**💰 Costliest Samples**")
+        st.dataframe(costliest_samples(HISTORY_VERSION, cost_run, details_source(cost_run)),
+                     use_container_width=True, hide_index=True)
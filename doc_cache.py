@@ -0,0 +1,110 @@
+import os
+import glob
+import json
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+from llm_cache import CACHE_DIR, cache_enabled
+
+# Bump to drop every cached parse after a change in how documents are loaded
+DOC_CACHE_VERSION = 1
+
+
+def file_digest(path):
+    """sha256 of a file's bytes, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse(loader_cls, path):
+    """Run one loader in a worker process; returns plain dicts so results pickle cheaply"""
+    return [{"page_content": d.page_content, "metadata": d.metadata} for d in loader_cls(path).load()]
+
+
+class DocumentCache:
+    """Parsed documents keyed by file content hash and loader.
+
+    Each entry is a JSON list of ``{page_content, metadata}`` records under
+    ``<root>/<hash>.json``. Renaming or moving a file keeps its entry; any
+    edit to its bytes misses and re-parses it.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(CACHE_DIR, "documents")
+        os.makedirs(self.root, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, digest, loader_cls):
+        loader = f"{loader_cls.__module__}.{loader_cls.__qualname__}"
+        return hashlib.sha256(f"{DOC_CACHE_VERSION}\0{loader}\0{digest}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        path = os.path.join(self.root, f"{key}.json")
+        try:
+            with open(path, "r") as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return records
+
+    def put(self, key, records):
+        """Atomically write one entry"""
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(records, f, ensure_ascii=False, default=str)
+        os.replace(tmp, os.path.join(self.root, f"{key}.json"))
+
+
+def load_documents(directory, pattern="**/*.docx", loader_cls=None, cache=None, max_workers=None):
+    """Load every file under ``directory`` matching ``pattern`` as LangChain documents.
+
+    Files whose content hash is cached are read from disk without parsing;
+    the rest are parsed in parallel in a process pool (inline when only one
+    file misses) and written back to the cache.
+    """
+    if loader_cls is None:
+        from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+        loader_cls = UnstructuredWordDocumentLoader
+    if cache is None and cache_enabled():
+        cache = DocumentCache()
+
+    paths = sorted(p for p in glob.glob(os.path.join(directory, pattern), recursive=True) if os.path.isfile(p))
+    records = {}
+    pending = {}
+    for path in paths:
+        key = cache.key(file_digest(path), loader_cls) if cache is not None else None
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            records[path] = cached
+        else:
+            pending[path] = key
+
+    if len(pending) == 1:
+        path = next(iter(pending))
+        records[path] = _parse(loader_cls, path)
+    elif pending:
+        workers = min(len(pending), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {path: pool.submit(_parse, loader_cls, path) for path in pending}
+            for path, future in futures.items():
+                records[path] = future.result()
+    if cache is not None:
+        for path, key in pending.items():
+            cache.put(key, records[path])
+
+    docs = []
+    for path in paths:
+        for record in records[path]:
+            # A cached parse may come from a copy of the file stored elsewhere
+            metadata = dict(record["metadata"], source=path)
+            docs.append(Document(page_content=record["page_content"], metadata=metadata))
+    return docs
@@ -0,0 +1,284 @@
+import os
+import asyncio
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single process only
+    fcntl = None
+
+from llm_cache import CACHE_DIR, cache_enabled
+from single_flight import SingleFlight, single_flight_enabled
+from telemetry import current_job
+
+KEY_BYTES = 16
+
+
+def text_key(model, text):
+    """Stable 16-byte digest of (model, text)"""
+    return hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class EmbeddingStore:
+    """Persistent float32 vector store backed by a memory-mapped array.
+
+    Layout under ``<root>/<model>/``:
+      - ``vectors.f32``: row-major float32 matrix, grown by doubling
+      - ``keys.bin``: append-only 16-byte digests; row i belongs to key i
+      - ``meta.json``: vector dimension
+
+    A vector is written and flushed before its key is appended, so a crash
+    can at worst lose the last write, never map a key to a half-written row.
+    Appends hold an exclusive file lock and first pick up keys other
+    processes (e.g. pytest-xdist workers) appended, so rows never collide.
+    Row numbers always come from the key file itself: a duplicate key keeps
+    its first row, and a torn trailing key is cut off before the next append.
+    """
+
+    INITIAL_ROWS = 1024
+
+    def __init__(self, model, root=None):
+        self.model = model
+        self.dir = os.path.join(root or os.path.join(CACHE_DIR, "embeddings"), model.replace("/", "_").replace(":", "_"))
+        self._vectors_path = os.path.join(self.dir, "vectors.f32")
+        self._keys_path = os.path.join(self.dir, "keys.bin")
+        self._meta_path = os.path.join(self.dir, "meta.json")
+        self._lock_path = os.path.join(self.dir, ".lock")
+        self._lock = threading.Lock()
+        self._vectors = None
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.dir, exist_ok=True)
+        self.index = {}
+        # Whole keys read from keys.bin so far, i.e. the next free row
+        self._rows = 0
+        self._read_keys()
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = json.load(f)["dim"]
+            self._map(max(self.INITIAL_ROWS, self._rows))
+
+    def __len__(self):
+        return len(self.index)
+
+    def _map(self, rows):
+        """(Re)map the vector file with room for at least ``rows`` rows"""
+        needed = rows * self.dim * 4
+        if not os.path.exists(self._vectors_path) or os.path.getsize(self._vectors_path) < needed:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(needed)
+        capacity = os.path.getsize(self._vectors_path) // (self.dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the store across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_keys(self):
+        """Index the whole keys appended since the last read; a duplicate keeps its first row"""
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._rows * KEY_BYTES)
+            raw = f.read()
+        for i in range(len(raw) // KEY_BYTES):
+            self.index.setdefault(raw[i * KEY_BYTES:(i + 1) * KEY_BYTES], self._rows + i)
+        self._rows += len(raw) // KEY_BYTES
+
+    def _refresh(self):
+        """Pick up the dimension and keys other processes wrote since we loaded (call under the file lock)"""
+        if self.dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = json.load(f)["dim"]
+        self._read_keys()
+        if os.path.exists(self._keys_path) and os.path.getsize(self._keys_path) > self._rows * KEY_BYTES:
+            # A crash mid-append left a partial key; drop it so later keys stay aligned
+            with open(self._keys_path, "r+b") as f:
+                f.truncate(self._rows * KEY_BYTES)
+        if self.dim is not None and (self._vectors is None or self._rows > self._vectors.shape[0]):
+            self._map(max(self.INITIAL_ROWS, self._rows))
+
+    def rows(self, keys):
+        """Row numbers for a list of keys (-1 where missing)"""
+        return np.fromiter((self.index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+
+    def get(self, text):
+        """Zero-copy view of the cached vector for ``text``, or None"""
+        vectors = self._vectors
+        row = self.index.get(text_key(self.model, text))
+        if row is None or vectors is None or row >= len(vectors):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return vectors[row]
+
+    def get_many(self, texts):
+        """Vectorized lookup: (matrix, found_mask) for a batch of texts"""
+        # Mapping first: put_many may index new rows and remap from another thread meanwhile,
+        # and a row past this mapping is treated as a miss
+        vectors = self._vectors
+        rows = self.rows([text_key(self.model, t) for t in texts])
+        found = (rows >= 0) & (rows < (len(vectors) if vectors is not None else 0))
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+        if vectors is None:
+            return None, found
+        # Gather in a single fancy-index; rows for misses are filled later
+        return vectors[np.where(found, rows, 0)], found
+
+    def put_many(self, texts, vectors):
+        """Append vectors for texts not yet stored"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or not len(vectors):
+            return
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._meta_path, "w") as f:
+                    json.dump({"dim": self.dim, "model": self.model}, f)
+                self._map(self.INITIAL_ROWS)
+
+            # dict keeps insertion order: keys and vectors stay aligned
+            new = {}
+            for text, vec in zip(texts, vectors):
+                key = text_key(self.model, text)
+                if key not in self.index:
+                    new.setdefault(key, vec)
+            if not new:
+                return
+            new_keys, new_rows = list(new), list(new.values())
+
+            start = self._rows
+            end = start + len(new_keys)
+            if end > self._vectors.shape[0]:
+                self._vectors.flush()
+                self._map(max(end, self._vectors.shape[0] * 2))
+            self._vectors[start:end] = np.stack(new_rows)
+            self._vectors.flush()
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new_keys))
+            for i, key in enumerate(new_keys):
+                self.index[key] = start + i
+            self._rows = end
+
+
+def _model_label(embeddings):
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or type(embeddings).__name__
+    dims = getattr(embeddings, "dimensions", None)
+    return f"{model}-{dims}" if dims else str(model)
+
+
+class CachedEmbeddings:
+    """Drop-in wrapper that serves embeddings from an EmbeddingStore.
+
+    Exposes both the LangChain/legacy ragas interface (``embed_query``,
+    ``embed_documents`` and async variants) and the newer ragas interface
+    (``embed_text``, ``embed_texts`` and async variants), delegating misses
+    to whichever batch method the wrapped model provides. Texts another
+    caller is already embedding are awaited rather than sent again.
+    Everything else is forwarded to the wrapped model.
+    """
+
+    def __init__(self, embeddings, store=None):
+        self.embeddings = embeddings
+        self.store = store if store is not None else EmbeddingStore(_model_label(embeddings))
+        # Separate sync/async flights: a blocking caller must never wait on an event loop task
+        self._flight = SingleFlight() if single_flight_enabled() else None
+        self._aflight = SingleFlight() if single_flight_enabled() else None
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
+    def _resolve(self, texts):
+        """Split a batch into cached vectors and the unique texts still to embed"""
+        texts = list(texts)
+        cached, found = self.store.get_many(texts)
+        job = current_job()
+        if job is not None:
+            # Vectors served from the store never reach the instrumented transport. They are
+            # texts, not requests, so they stay out of the request hit rate
+            job.embedding_store_hits += int(found.sum())
+        missing = list(dict.fromkeys(t for t, hit in zip(texts, found) if not hit))
+        return texts, cached, found, missing
+
+    def _merge(self, texts, cached, found, missing, fresh, stored=False):
+        lookup = {}
+        if missing:
+            if not stored:
+                self.store.put_many(missing, fresh)
+            lookup = dict(zip(missing, fresh))
+        out = []
+        for i, text in enumerate(texts):
+            vec = cached[i] if found[i] else lookup[text]
+            out.append(np.asarray(vec, dtype=np.float32).tolist())
+        return out
+
+    def _fetch(self, texts):
+        inner = self.embeddings
+        if hasattr(inner, "embed_documents"):
+            return inner.embed_documents(texts)
+        return inner.embed_texts(texts)
+
+    async def _afetch(self, texts):
+        inner = self.embeddings
+        if hasattr(inner, "aembed_documents"):
+            return await inner.aembed_documents(texts)
+        return await inner.aembed_texts(texts)
+
+    def embed_documents(self, texts):
+        texts, cached, found, missing = self._resolve(texts)
+        fresh = []
+        if missing:
+            fresh = self._flight.many(missing, self._fetch) if self._flight else self._fetch(missing)
+        return self._merge(texts, cached, found, missing, fresh)
+
+    async def aembed_documents(self, texts):
+        texts, cached, found, missing = self._resolve(texts)
+        fresh = []
+        if missing:
+            fresh = await self._aflight.amany(missing, self._afetch) if self._aflight else await self._afetch(missing)
+            # put_many takes a cross-process file lock, may remap and flushes: keep it off the event loop
+            await asyncio.to_thread(self.store.put_many, missing, fresh)
+        return self._merge(texts, cached, found, missing, fresh, stored=True)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+    def embed_texts(self, texts, **kwargs):
+        return self.embed_documents(texts)
+
+    async def aembed_texts(self, texts, **kwargs):
+        return await self.aembed_documents(texts)
+
+    def embed_text(self, text, **kwargs):
+        return self.embed_query(text)
+
+    async def aembed_text(self, text, **kwargs):
+        return await self.aembed_query(text)
+
+
+def cached_embeddings(embeddings):
+    """Wrap ``embeddings`` in the persistent store unless caching is disabled"""
+    if not cache_enabled():
+        return embeddings
+    return CachedEmbeddings(embeddings)
@@ -0,0 +1,115 @@
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from results_store import get_results_store
+
+N_RESAMPLES = 2000
+CONFIDENCE = 0.95
+# Absolute score difference below which a pair counts as a tie
+TIE_TOLERANCE = 1e-6
+# Cap on resample indices held at once (rows x resamples), ~16 MB of int32
+MAX_BOOTSTRAP_CELLS = 4_000_000
+
+
+def paired_scores(base_df, challenger_df, metric):
+    """(base, challenger) score arrays for samples scored in both runs, joined on sample_id.
+
+    Repeated sample IDs within a run are averaged, and pairs where either
+    side failed (NaN) are dropped.
+    """
+    base = base_df.groupby("sample_id")[metric].mean()
+    challenger = challenger_df.groupby("sample_id")[metric].mean()
+    joined = pd.concat([base.rename("base"), challenger.rename("challenger")], axis=1, join="inner").dropna()
+    return joined["base"].to_numpy(dtype=float), joined["challenger"].to_numpy(dtype=float)
+
+
+def bootstrap_means(deltas, n_resamples=N_RESAMPLES, seed=0):
+    """Means of n_resamples bootstrap resamples of deltas, drawn as index matrices in bounded chunks"""
+    n = len(deltas)
+    rng = np.random.default_rng(seed)
+    means = np.empty(n_resamples)
+    chunk = max(1, MAX_BOOTSTRAP_CELLS // max(n, 1))
+    for start in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - start)
+        idx = rng.integers(0, n, size=(size, n), dtype=np.int32)
+        means[start:start + size] = deltas[idx].mean(axis=1)
+    return means
+
+
+def paired_stats(base, challenger, n_resamples=N_RESAMPLES, confidence=CONFIDENCE, tie_tolerance=TIE_TOLERANCE, seed=0):
+    """Paired delta (challenger - base) with a percentile bootstrap CI and win/loss/tie counts"""
+    deltas = challenger - base
+    n = len(deltas)
+    stats = {
+        "n_pairs": n,
+        "base_mean": base.mean() if n else np.nan,
+        "challenger_mean": challenger.mean() if n else np.nan,
+        "mean_delta": deltas.mean() if n else np.nan,
+        "ci_low": np.nan,
+        "ci_high": np.nan,
+        "wins": int((deltas > tie_tolerance).sum()),
+        "losses": int((deltas < -tie_tolerance).sum()),
+        "ties": int((np.abs(deltas) <= tie_tolerance).sum()),
+        "significant": False,
+    }
+    if n > 1:
+        means = bootstrap_means(deltas, n_resamples, seed)
+        alpha = (1 - confidence) / 2
+        low, high = np.quantile(means, [alpha, 1 - alpha])
+        stats.update(ci_low=low, ci_high=high, significant=bool(low > 0 or high < 0))
+    return stats
+
+
+def compare_runs(base_df, challenger_df, metrics=None, n_resamples=N_RESAMPLES, confidence=CONFIDENCE,
+                 tie_tolerance=TIE_TOLERANCE, seed=0):
+    """One row of paired statistics per metric scored in both runs"""
+    if metrics is None:
+        numeric = set(base_df.select_dtypes("number").columns) & set(challenger_df.select_dtypes("number").columns)
+        metrics = [c for c in base_df.columns if c in numeric]
+    rows = []
+    for metric in metrics:
+        if metric not in base_df.columns or metric not in challenger_df.columns:
+            continue
+        base, challenger = paired_scores(base_df, challenger_df, metric)
+        stats = paired_stats(base, challenger, n_resamples, confidence, tie_tolerance, seed)
+        rows.append(dict(metric=metric, **stats))
+    return pd.DataFrame(rows)
+
+
+def compare_store_runs(base_run, challenger_run, metrics=None, store=None, **kwargs):
+    """compare_runs over two runs' per-sample scores in the results store"""
+    store = store or get_results_store()
+    frames = []
+    for run_id in (base_run, challenger_run):
+        if not store.has_details(run_id):
+            raise ValueError(f"No per-sample details for run {run_id} in {store.root}")
+        columns = None if metrics is None else ["sample_id", *metrics]
+        frames.append(store.details(run_id, columns=columns))
+    return compare_runs(frames[0], frames[1], metrics, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paired per-sample comparison of two evaluation runs")
+    parser.add_argument("base", help="Baseline run_id")
+    parser.add_argument("challenger", help="Challenger run_id")
+    parser.add_argument("--metrics", nargs="+", help="Metrics to compare (default: all shared)")
+    parser.add_argument("--resamples", type=int, default=N_RESAMPLES, help="Bootstrap resamples")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help="Confidence level of the interval")
+    args = parser.parse_args(argv)
+
+    result = compare_store_runs(args.base, args.challenger, args.metrics,
+                                n_resamples=args.resamples, confidence=args.confidence)
+    if result.empty:
+        print("⚠️ No shared scored samples between the two runs.")
+        return
+    print(f"⚔️ {args.challenger} vs {args.base} ({args.confidence:.0%} bootstrap CI, {args.resamples} resamples)")
+    print(result.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
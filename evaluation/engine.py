@@ -0,0 +1,141 @@
+import asyncio
+import inspect
+import logging
+import math
+
+import pandas as pd
+from tqdm.auto import tqdm
+from ragas import SingleTurnSample, MultiTurnSample
+from ragas.run_config import RunConfig
+from ragas.metrics.base import SingleTurnMetric, MultiTurnMetric
+
+from telemetry import JobStats
+
+logger = logging.getLogger(__name__)
+
+
+def is_collections_metric(metric):
+    """True for ``ragas.metrics.collections`` metrics, which score fields rather than samples"""
+    return not isinstance(metric, (SingleTurnMetric, MultiTurnMetric)) and hasattr(metric, "ascore")
+
+
+async def collections_ascore(metric, sample, timeout=None):
+    """Score `sample` with a collections metric, passing the fields its ``ascore`` takes"""
+    fields = sample.to_dict()
+    params = inspect.signature(metric.ascore).parameters
+    result = await asyncio.wait_for(metric.ascore(**{k: fields.get(k) for k in params if k in fields}), timeout)
+    return getattr(result, "value", result)
+
+
+class EvaluationEngine:
+    """Scores every (sample, metric) pair on one asyncio task pool.
+
+    Single- and multi-turn samples are scheduled together, so the slow
+    phase no longer waits for the other to finish: total time approaches
+    the longest job chain instead of the sum of both ``evaluate()`` calls.
+    A single semaphore caps how many judge jobs are in flight at once.
+    Failed or timed-out jobs score NaN, like ``ragas.evaluate``.
+
+    Besides the legacy ``ragas.metrics`` classes, ``ragas.metrics.collections``
+    metrics are scored too: they are called with ``ascore(**fields)``, taking
+    the sample fields their signature asks for.
+
+    With a ``ScoreManifest``, pairs whose fingerprint is unchanged since the
+    previous run reuse the stored score and only new or changed pairs are
+    sent to the judge.
+
+    Every job run records its latency, tokens, retries, cache hits and
+    estimated cost in ``job_stats`` (see telemetry.py).
+    """
+
+    def __init__(self, metrics, max_concurrency=16, run_config=None, show_progress=True, manifest=None):
+        self.metrics = metrics
+        self.max_concurrency = max_concurrency
+        self.run_config = run_config or RunConfig(max_workers=max_concurrency)
+        self.show_progress = show_progress
+        self.manifest = manifest
+        self.reused = 0
+        self.scored = 0
+        self.job_stats = []
+        for metric in self.metrics:
+            if not is_collections_metric(metric):
+                metric.init(self.run_config)
+
+    def metrics_for(self, sample):
+        """Metrics that apply to this kind of sample"""
+        if isinstance(sample, SingleTurnSample):
+            return [m for m in self.metrics if isinstance(m, SingleTurnMetric) or is_collections_metric(m)]
+        if isinstance(sample, MultiTurnSample):
+            return [m for m in self.metrics if isinstance(m, MultiTurnMetric)]
+        raise ValueError(f"Unsupported sample type {type(sample)}")
+
+    def jobs(self, samples):
+        """Every (row index, sample, metric) pair to score"""
+        return [(i, sample, metric) for i, sample in enumerate(samples) for metric in self.metrics_for(sample)]
+
+    async def score_job(self, sample, metric):
+        """Score one pair, NaN on failure"""
+        try:
+            if is_collections_metric(metric):
+                return await collections_ascore(metric, sample, self.run_config.timeout)
+            if isinstance(sample, MultiTurnSample):
+                return await metric.multi_turn_ascore(sample, timeout=self.run_config.timeout)
+            return await metric.single_turn_ascore(sample, timeout=self.run_config.timeout)
+        except Exception as e:
+            logger.warning("%s failed: %s: %s", metric.name, type(e).__name__, e)
+            return math.nan
+
+    async def run_jobs(self, jobs):
+        """Run jobs under the global concurrency cap; returns scores in job order"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        progress = tqdm(total=len(jobs), desc="Evaluating", disable=not self.show_progress or not jobs)
+
+        async def run(row, sample, metric):
+            async with semaphore:
+                # Each gathered job is its own task, so its JobStats only sees its own calls
+                with JobStats(metric.name, row) as stats:
+                    score = await self.score_job(sample, metric)
+            self.job_stats.append(stats.as_dict())
+            progress.update(1)
+            return score
+
+        try:
+            return await asyncio.gather(*(run(row, sample, metric) for row, sample, metric in jobs))
+        finally:
+            progress.close()
+
+    async def score(self, samples):
+        """Score all samples and return one row per sample (sample fields + metric columns)"""
+        samples = list(samples)
+        jobs = self.jobs(samples)
+        self.job_stats = []
+        scores = [None] * len(jobs)
+        fingerprints = [None] * len(jobs)
+        if self.manifest is not None:
+            for n, (_, sample, metric) in enumerate(jobs):
+                fingerprints[n] = self.manifest.fingerprint(sample, metric)
+                scores[n] = self.manifest.lookup(fingerprints[n])
+
+        pending = [n for n, score in enumerate(scores) if score is None]
+        self.reused = len(jobs) - len(pending)
+        self.scored = len(pending)
+        for n, score in zip(pending, await self.run_jobs([jobs[n] for n in pending])):
+            scores[n] = score
+        # Reused pairs are reported too, at zero cost, so fully reused runs still show up in spend history
+        pending_set = set(pending)
+        self.job_stats.extend(JobStats(metric.name, row, reused=True).as_dict()
+                              for n, (row, _, metric) in enumerate(jobs) if n not in pending_set)
+
+        if self.manifest is not None:
+            for fingerprint, score in zip(fingerprints, scores):
+                self.manifest.record(fingerprint, score)
+            self.manifest.save()
+
+        rows = [sample.to_dict() for sample in samples]
+        for (i, _, metric), score in zip(jobs, scores):
+            rows[i][metric.name] = score
+
+        metric_names = [m.name for m in self.metrics]
+        df = pd.DataFrame(rows)
+        sample_columns = [c for c in df.columns if c not in metric_names]
+        return df[sample_columns + [m for m in metric_names if m in df.columns]]
@@ -0,0 +1,103 @@
+import os
+import json
+import math
+import hashlib
+import tempfile
+
+import ragas
+
+from llm_cache import CACHE_DIR
+
+MANIFEST_PATH = os.path.join(CACHE_DIR, "score_manifest.json")
+
+# Bump to invalidate every stored score after a change in how samples are scored
+MANIFEST_VERSION = 1
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def metric_version(metric):
+    """Everything about a metric that can change its score for the same inputs.
+
+    Covers the class, the ragas version, scalar settings such as mode or
+    atomicity, the prompt instructions and few-shot examples, and the judge
+    LLM / embedding models it is wired to.
+    """
+    config = {k: v for k, v in vars(metric).items() if isinstance(v, (str, int, float, bool)) and not k.startswith("_")}
+    prompts = {}
+    for name, prompt in sorted(metric.get_prompts().items()):
+        examples = [[i.model_dump(), o.model_dump()] for i, o in getattr(prompt, "examples", [])]
+        prompts[name] = [getattr(prompt, "instruction", ""), examples]
+    llm = getattr(metric, "llm", None)
+    embeddings = getattr(metric, "embeddings", None)
+    return {
+        "class": f"{type(metric).__module__}.{type(metric).__qualname__}",
+        "ragas": ragas.__version__,
+        "config": config,
+        "prompts": hashlib.sha256(_canonical(prompts).encode("utf-8")).hexdigest(),
+        "judge_model": getattr(llm, "model", None) or getattr(llm, "model_name", None),
+        "embedding_model": getattr(embeddings, "model", None) if embeddings is not None else None,
+    }
+
+
+def metric_inputs(sample, metric):
+    """Only the sample fields the metric reads, so unrelated edits do not trigger a re-score"""
+    data = sample.to_dict()
+    columns = set()
+    for required in metric.required_columns.values():
+        columns.update(c.split(":")[0] for c in required)
+    return {k: v for k, v in data.items() if k in columns}
+
+
+class ScoreManifest:
+    """Fingerprint -> score map from the previous run.
+
+    A fingerprint hashes a metric's inputs for one sample together with
+    ``metric_version``; an unchanged fingerprint means the stored score can
+    be reused instead of calling the judge again. Only the latest run's
+    entries are kept, so the file stays the size of the dataset.
+    """
+
+    def __init__(self, path=None, reuse=True):
+        self.path = path or MANIFEST_PATH
+        self.previous = {}
+        self.current = {}
+        self._versions = {}
+        if reuse and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except ValueError:
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                self.previous = data.get("scores", {})
+
+    def fingerprint(self, sample, metric):
+        version = self._versions.get(id(metric))
+        if version is None:
+            version = self._versions[id(metric)] = _canonical(metric_version(metric))
+        payload = _canonical({"metric": metric.name, "version": version, "inputs": metric_inputs(sample, metric)})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, fingerprint):
+        """Previous score for this fingerprint, or None (failed scores are never reused)"""
+        score = self.previous.get(fingerprint)
+        if score is None or (isinstance(score, float) and math.isnan(score)):
+            return None
+        return score
+
+    def record(self, fingerprint, score):
+        if score is None or (isinstance(score, float) and math.isnan(score)):
+            return
+        self.current[fingerprint] = float(score)
+
+    def save(self):
+        """Atomically replace the manifest with this run's scores"""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "scores": self.current}, f)
+        os.replace(tmp, self.path)
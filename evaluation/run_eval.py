@@ -2,47 +2,52 @@ import os
 import sys
 import json
 import asyncio
+import argparse
 from datetime import datetime
-import pandas as pd
-from ragas import SingleTurnSample, EvaluationDataset, evaluate
 import warnings
 # Filter specific deprecation warnings from ragas
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="ragas")
 
-from ragas import SingleTurnSample, MultiTurnSample, EvaluationDataset, evaluate
-from ragas.messages import HumanMessage, AIMessage
-from ragas.metrics import (
-    ContextPrecision,
-    ContextRecall,
-    Faithfulness,
-    AnswerRelevancy,
-    FactualCorrectness,
-    TopicAdherenceScore
-)
-from langchain_openai import OpenAIEmbeddings
-from ragas.llms import llm_factory
-from openai import AsyncOpenAI
-
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import load_test_data, get_llm_response
 
-async def main():
-    print("🚀 Starting Ragas Evaluation Run...")
-    
-    # 1. Setup LLM and Embeddings
-    apikey = os.getenv("OPENAI_API_KEY")
-    if not apikey:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    
-    client = AsyncOpenAI(api_key=apikey)
-    llm_model = llm_factory("gpt-4o", client=client)
+# ragas, langchain, openai, pandas and pyarrow are imported inside the functions
+# that use them, so `--help` and importing this module stay fast
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results")
+CHECKPOINT_DIR = os.path.join(RESULTS_DIR, "checkpoints")
+
+
+def build_metrics(apikey):
+    """Judge LLM, embeddings and the metric set used for every run"""
+    from ragas.metrics import (
+        ContextPrecision,
+        ContextRecall,
+        Faithfulness,
+        AnswerRelevancy,
+        FactualCorrectness,
+        TopicAdherenceScore
+    )
+    from ragas.llms import llm_factory
+    from langchain_openai import OpenAIEmbeddings
+    from llm_clients import (build_async_openai, build_http_client, build_async_http_client, uses_local_openai,
+                             JUDGE_MODEL, EMBEDDING_MODEL)
+    from embedding_cache import cached_embeddings
+
+    # Judge calls are served from the on-disk verdict cache when unchanged
+    client = build_async_openai(api_key=apikey)
+    llm_model = llm_factory(JUDGE_MODEL, client=client)
     # Use LangChain embeddings for compatibility with old metrics
-    embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small", api_key=apikey)
-    
-    # 2. Define Metrics
+    # Wrapped in the on-disk embedding store so repeat runs skip re-embedding
+    # Against the local stand-in, send raw strings rather than tiktoken ids so no tokenizer
+    # download is needed offline; the real API keeps LangChain's context-length chunking
+    # The http clients share the process-wide rate limiter with the judge
+    embeddings_model = cached_embeddings(OpenAIEmbeddings(
+        model=EMBEDDING_MODEL, api_key=apikey, check_embedding_ctx_length=not uses_local_openai(),
+        http_client=build_http_client(), http_async_client=build_async_http_client()))
+
     # Single Turn Metrics
-    metrics = [
+    return [
         ContextPrecision(llm=llm_model),
         ContextRecall(llm=llm_model),
         Faithfulness(llm=llm_model),
@@ -50,6 +55,233 @@ async def main():
         FactualCorrectness(llm=llm_model),
         TopicAdherenceScore(llm=llm_model)
     ]
+
+
+async def fetch_answers(single_turn_items, concurrency=8, timeout=5.0, deadline=15.0):
+    """Fill in `answer`/`retrieved_contexts` for items without one; failed fetches stay unanswered"""
+    from utils import aget_llm_responses
+
+    # Fetch all missing RAG answers concurrently, results stay in input order
+    pending = [item for item in single_turn_items if "answer" not in item]
+    if pending:
+        print(f"🌐 Fetching {len(pending)} RAG responses (concurrency={concurrency}, timeout={timeout}s)...")
+        responses = await aget_llm_responses(pending, concurrency=concurrency, timeout=timeout, deadline=deadline)
+        for item, responseDict in zip(pending, responses):
+            if isinstance(responseDict, Exception):
+                print(f"⚠️ Skipping '{item['question']}': {responseDict}")
+                continue
+            item["answer"] = responseDict["answer"]
+            item["retrieved_contexts"] = [doc["page_content"] for doc in responseDict.get("retrieved_docs", [])]
+
+
+def to_sample(item):
+    """ragas sample for a raw Test5 (single-turn) or Test6 (multi-turn) item, None if unanswered"""
+    from ragas import SingleTurnSample, MultiTurnSample
+    from ragas.messages import HumanMessage, AIMessage
+
+    if "conversation" in item:
+        conversation = []
+        for msg in item["conversation"]:
+            if msg["role"] == "user":
+                conversation.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                conversation.append(AIMessage(content=msg["content"]))
+
+        return MultiTurnSample(
+            user_input=conversation,
+            reference_topics=item.get("reference_topics", [])
+        )
+
+    if "answer" not in item:
+        return None
+
+    contexts = item.get("retrieved_contexts", [])
+    if not contexts and "retrieved_docs" in item:
+         contexts = [doc["page_content"] if isinstance(doc, dict) else doc for doc in item["retrieved_docs"]]
+
+    return SingleTurnSample(
+        user_input=item["question"],
+        response=item["answer"],
+        retrieved_contexts=contexts,
+        reference=item["reference"]
+    )
+
+
+async def load_samples(single_turn_items, multi_turn_items, concurrency=8, timeout=5.0, deadline=15.0):
+    """Turn raw Test5/Test6-style items into ragas samples, fetching missing RAG answers"""
+    await fetch_answers(single_turn_items, concurrency=concurrency, timeout=timeout, deadline=deadline)
+    samples = [to_sample(item) for item in single_turn_items]
+    samples += [to_sample(item) for item in multi_turn_items if "conversation" in item]
+    return [sample for sample in samples if sample is not None]
+
+
+async def score_samples(samples, metrics, max_concurrency=16, manifest=None, job_stats=None):
+    """Score single- and multi-turn samples together and return one combined DataFrame.
+
+    With a manifest, only (sample, metric) pairs that changed since the last run are re-scored.
+    Per-job cost/latency records are appended to `job_stats` if a list is given.
+    """
+    from ragas import SingleTurnSample, MultiTurnSample
+    from evaluation.engine import EvaluationEngine
+
+    single_turn_count = sum(isinstance(s, SingleTurnSample) for s in samples)
+    multi_turn_count = sum(isinstance(s, MultiTurnSample) for s in samples)
+    print(f"⚡ Running Ragas evaluation for {single_turn_count} single-turn and "
+          f"{multi_turn_count} multi-turn samples (judge concurrency={max_concurrency})...")
+
+    # One task pool for both sample types, each metric only runs on the samples it supports
+    engine = EvaluationEngine(metrics, max_concurrency=max_concurrency, manifest=manifest)
+    df = await engine.score(samples)
+    if job_stats is not None:
+        job_stats.extend(engine.job_stats)
+    if manifest is not None and engine.reused:
+        print(f"♻️ Reused {engine.reused} unchanged scores, scored {engine.scored} new or changed pairs")
+    return df
+
+
+def new_run_id(results_dir=RESULTS_DIR):
+    """Minute-resolution timestamp, suffixed if a run with that ID already exists"""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
+    run_id, n = timestamp, 1
+    while os.path.exists(os.path.join(results_dir, f"{run_id}_summary.json")):
+        n += 1
+        run_id = f"{timestamp}-{n}"
+    return run_id
+
+
+def cost_latency_summary(job_stats, sample_ids):
+    """(summary `cost_latency` section, {sample_id: costs} for the store); job rows index into `sample_ids`"""
+    from telemetry import summarize, spend_line
+
+    jobs = [dict(stats, sample_id=sample_ids[stats["row"]]) for stats in job_stats]
+    cost_latency = summarize(jobs)
+    # Per-sample costs grow with the dataset: they live in the store, not in the summary
+    sample_costs = cost_latency.pop("per_sample")
+    print(spend_line(cost_latency))
+    return cost_latency, sample_costs
+
+
+def write_results(df, total_samples, results_dir=RESULTS_DIR, store=None, job_stats=None):
+    """Save the per-sample CSV, the summary JSON and the columnar store entry; returns CSV and JSON paths"""
+    from results_store import ResultsStore, sample_id
+
+    timestamp = new_run_id(results_dir)
+    os.makedirs(results_dir, exist_ok=True)
+    store = store if store is not None else ResultsStore(os.path.join(results_dir, "store"))
+    metric_names = df.select_dtypes("number").columns.tolist()
+
+    # Stable IDs let runs be joined sample by sample
+    if "sample_id" not in df.columns:
+        df.insert(0, "sample_id", [sample_id(u, r) for u, r in zip(df["user_input"], df.get("reference", [None] * len(df)))])
+
+    # Save Detailed CSV
+    df["run_id"] = timestamp
+    csv_path = os.path.join(results_dir, f"{timestamp}_details.csv")
+    df.to_csv(csv_path, index=False)
+    print(f"💾 Saved detailed results to {csv_path}")
+
+    # Save Summary JSON
+    # We calculate summary from the full dataframe to average across all samples where metric applies
+    summary = df.mean(numeric_only=True).to_dict()
+    summary["run_id"] = timestamp
+    summary["timestamp"] = datetime.now().isoformat()
+    summary["total_samples"] = total_samples
+    # Always present, so a run that reused every score still shows up, at $0, in the spend history
+    summary["cost_latency"], sample_costs = cost_latency_summary(job_stats or [], df["sample_id"].tolist())
+
+    json_path = os.path.join(results_dir, f"{timestamp}_summary.json")
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    print(f"💾 Saved summary to {json_path}")
+
+    store.record_run(summary, df.to_dict("records"), metric_names, sample_costs=sample_costs)
+    print(f"🗃️ Recorded run {timestamp} in {store.root}")
+    return csv_path, json_path
+
+
+async def run_stream(path, metrics, checkpoint_path=None, batch_size=50, concurrency=8, timeout=5.0, deadline=15.0,
+                     judge_concurrency=16, restart=False, results_dir=RESULTS_DIR, allow_missing=False):
+    """Score a large testset in bounded batches, checkpointing every finished sample.
+
+    Items are read lazily from `path` (JSON array or JSONL), so memory stays
+    flat in the dataset size. Finished rows, with the cost/latency of their
+    jobs, are appended to a JSONL checkpoint after each batch; re-running
+    with the same checkpoint skips every sample already in it. Results are written from the checkpoint once
+    the whole file has been scored, after which the checkpoint is removed.
+    With `allow_missing`, samples that got no RAG answer are left out and
+    results are written anyway, with their count recorded as `skipped`.
+    """
+    from results_store import ResultsStore
+    from evaluation.engine import EvaluationEngine
+    from evaluation.stream import (iter_json_items, normalize_item, item_id, batched, Checkpoint, write_results_streaming,
+                                   JOBS_KEY)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    checkpoint_path = checkpoint_path or os.path.join(CHECKPOINT_DIR, f"{name}.jsonl")
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    if checkpoint.done:
+        print(f"⏯️ Resuming from {checkpoint_path}: {len(checkpoint.done)} samples already scored")
+
+    engine = EvaluationEngine(metrics, max_concurrency=judge_concurrency, show_progress=False)
+    skipped = 0
+    items = (normalize_item(item) for item in iter_json_items(path))
+    for batch in batched(((item_id(item), item) for item in items), batch_size):
+        # First occurrence wins: a repeated ID would be scored and checkpointed twice
+        pending = {}
+        for sid, item in batch:
+            if sid not in checkpoint.done:
+                pending.setdefault(sid, item)
+        batch = list(pending.items())
+        if not batch:
+            continue
+        await fetch_answers([item for _, item in batch if "conversation" not in item],
+                            concurrency=concurrency, timeout=timeout, deadline=deadline)
+        ready = [(sid, to_sample(item)) for sid, item in batch]
+        ready = [(sid, sample) for sid, sample in ready if sample is not None]
+        # Unanswered items are not checkpointed, so a resume retries them
+        skipped += len(batch) - len(ready)
+        if not ready:
+            continue
+
+        df = await engine.score([sample for _, sample in ready])
+        rows = df.to_dict("records")
+        # Each sample's cost/latency travels with its checkpoint row, so memory stays flat and a resume keeps it
+        for stats in engine.job_stats:
+            rows[stats["row"]].setdefault(JOBS_KEY, []).append({k: v for k, v in stats.items() if k != "row"})
+        checkpoint.append([dict(sample_id=sid, **row) for (sid, _), row in zip(ready, rows)])
+        print(f"✅ Checkpointed {len(checkpoint.done)} samples")
+
+    if skipped and not allow_missing:
+        print(f"⚠️ {skipped} samples had no RAG answer; re-run to retry them before results are written "
+              f"(or pass --allow-missing to write partial results)")
+        checkpoint.close()
+        return None
+    if skipped:
+        print(f"⚠️ Writing partial results: {skipped} samples had no RAG answer and are left out")
+
+    store = ResultsStore(os.path.join(results_dir, "store"))
+    paths = write_results_streaming(checkpoint, [m.name for m in metrics], len(checkpoint.done), results_dir,
+                                    new_run_id(results_dir), store=store, skipped=skipped)
+    checkpoint.remove()
+    return paths
+
+
+async def main(concurrency=8, timeout=5.0, deadline=15.0, judge_concurrency=16, full=False,
+               stream=None, checkpoint=None, batch_size=50, restart=False, allow_missing=False):
+    print("🚀 Starting Ragas Evaluation Run...")
+    from utils import load_test_data
+    from llm_cache import get_default_cache
+    from evaluation.manifest import ScoreManifest
+    
+    # 1. Setup LLM and Embeddings
+    apikey = os.getenv("OPENAI_API_KEY")
+    if not apikey:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    
+    # 2. Define Metrics
+    metrics = build_metrics(apikey)
     
     print(f"Metrics defined: {[type(m) for m in metrics]}")
     # Verify strict instance check if needed, though Ragas check seems to be failing
@@ -58,124 +290,73 @@ async def main():
         if not isinstance(m, Metric):
              print(f"⚠️ Metric {i} ({type(m)}) is not an instance of ragas.metrics.base.Metric")
 
+    if stream:
+        # Large testsets: lazy read, bounded batches, resumable checkpoint
+        print(f"📂 Streaming test data from {stream} (batch size {batch_size})...")
+        await run_stream(stream, metrics, checkpoint_path=checkpoint, batch_size=batch_size, concurrency=concurrency,
+                         timeout=timeout, deadline=deadline, judge_concurrency=judge_concurrency, restart=restart,
+                         allow_missing=allow_missing)
+        return
+
     # 3. Load Data
     print("📂 Loading test data...")
-    samples = []
 
     # Load Single Turn Data (Test5.json)
+    raw_data_5 = []
     try:
         raw_data_5 = load_test_data("Test5.json")
-        for item in raw_data_5:
-            # Simple single turn processing
-            if "answer" not in item:
-                 responseDict = get_llm_response(item)
-                 item["answer"] = responseDict["answer"]
-                 item["retrieved_contexts"] = [doc["page_content"] for doc in responseDict.get("retrieved_docs", [])]
-            
-            contexts = item.get("retrieved_contexts", [])
-            if not contexts and "retrieved_docs" in item:
-                 contexts = [doc["page_content"] if isinstance(doc, dict) else doc for doc in item["retrieved_docs"]]
-                
-            sample = SingleTurnSample(
-                user_input=item["question"],
-                response=item["answer"],
-                retrieved_contexts=contexts,
-                reference=item["reference"]
-            )
-            samples.append(sample)
     except Exception as e:
         print(f"⚠️ Could not load Test5.json: {e}")
 
     # Load Multi Turn Data (Test6.json)
+    raw_data_6 = []
     try:
         raw_data_6 = load_test_data("Test6.json")
-        for item in raw_data_6:
-            if "conversation" in item:
-                conversation = []
-                for msg in item["conversation"]:
-                    if msg["role"] == "user":
-                        conversation.append(HumanMessage(content=msg["content"]))
-                    elif msg["role"] == "assistant":
-                        conversation.append(AIMessage(content=msg["content"]))
-                
-                sample = MultiTurnSample(
-                    user_input=conversation,
-                    reference_topics=item.get("reference_topics", [])
-                )
-                samples.append(sample)
     except Exception as e:
         print(f"⚠️ Could not load Test6.json: {e}")
-        
+
+    samples = await load_samples(raw_data_5, raw_data_6, concurrency=concurrency, timeout=timeout, deadline=deadline)
     print(f"✅ Loaded {len(samples)} samples.")
 
     # 4. Run Evaluation
-    # Separate samples by type as EvaluationDataset requires homogeneous samples
-    single_turn_samples = [s for s in samples if isinstance(s, SingleTurnSample)]
-    multi_turn_samples = [s for s in samples if isinstance(s, MultiTurnSample)]
-
-    print(f"⚡ Running Ragas evaluation for {len(single_turn_samples)} single-turn samples...")
-    results_single = {}
-    if single_turn_samples:
-        eval_dataset_single = EvaluationDataset(single_turn_samples)
-        # Filter metrics relevant for single turn (TopicAdherenceScore can be both but lets rely on internal checks or strict split)
-        # Actually Ragas metrics usually handle their own types or return N/A.
-        # But for strictly single turn samples, TopicAdherence might fail if it expects MultiTurnSample inputs.
-        # Let's pass all metrics and assume Ragas handles it OR filter if needed.
-        # TopicAdherenceScore is MultiTurnMetric, others are SingleTurnMetric.
-        # Using all metrics on SingleTurnSample might crash if incompatible.
-        # Let's try passing all - if it fails we filter.
-        # Update: We know ContextPrecision etc are SingleTurn. TopicAdherence is MultiTurn.
-        
-        single_turn_metrics = [m for m in metrics if not isinstance(m, TopicAdherenceScore)]
-        results_single = evaluate(dataset=eval_dataset_single, metrics=single_turn_metrics)
-    
-    results_multi = {}
-    if multi_turn_samples:
-         print(f"⚡ Running Ragas evaluation for {len(multi_turn_samples)} multi-turn samples...")
-         eval_dataset_multi = EvaluationDataset(multi_turn_samples)
-         # Filter metrics for multi turn
-         multi_turn_metrics = [m for m in metrics if isinstance(m, TopicAdherenceScore)]
-         results_multi = evaluate(dataset=eval_dataset_multi, metrics=multi_turn_metrics)
-
-    # Merge results
-    # Ragas Results object behaves like a dict but also has methods.
-    # To combine, we will merge the underlying dictonaries of scores.
-    # Note: This simple merge creates a combined summary, but 'results' object functionality might be limited.
-    # For reporting we mainly need the scores.
-    
-    # We will construct a combined Dataframe for details and a combined dict for summary
-    
-    df_single = results_single.to_pandas() if results_single else pd.DataFrame()
-    df_multi = results_multi.to_pandas() if results_multi else pd.DataFrame()
-    
-    # Align columns
-    df = pd.concat([df_single, df_multi], ignore_index=True)
-    
+    # Reuse scores of unchanged (sample, metric) pairs unless a full re-score is requested;
+    # either way this run's fingerprints become the baseline for the next one
+    manifest = ScoreManifest(reuse=not full)
+    job_stats = []
+    df = await score_samples(samples, metrics, max_concurrency=judge_concurrency, manifest=manifest, job_stats=job_stats)
     print("✅ Evaluation complete.")
-    # print(results) # Can't print unified results object easily without one object
     
     # 5. Save Results
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-    results_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results")
-    os.makedirs(results_dir, exist_ok=True)
-    
-    # Save Detailed CSV
-    df["run_id"] = timestamp
-    csv_path = os.path.join(results_dir, f"{timestamp}_details.csv")
-    df.to_csv(csv_path, index=False)
-    print(f"💾 Saved detailed results to {csv_path}")
-    
-    # Save Summary JSON
-    # We calculate summary from the full dataframe to average across all samples where metric applies
-    summary = df.mean(numeric_only=True).to_dict()
-    summary["run_id"] = timestamp
-    summary["timestamp"] = datetime.now().isoformat()
-    summary["total_samples"] = len(samples)
-    
-    json_path = os.path.join(results_dir, f"{timestamp}_summary.json")
-    with open(json_path, "w") as f:
-        json.dump(summary, f, indent=4)
-    print(f"💾 Saved summary to {json_path}")
+    write_results(df, len(samples), job_stats=job_stats)
+
+    cache = get_default_cache()
+    if cache is not None:
+        print(f"🗄️ Judge cache: {cache.hits} hits, {cache.misses} misses")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the Ragas evaluation suite")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max concurrent RAG endpoint requests")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-attempt HTTP timeout in seconds")
+    parser.add_argument("--deadline", type=float, default=15.0, help="Per-request deadline in seconds, retries included")
+    parser.add_argument("--judge-concurrency", type=int, default=16, help="Max concurrent metric jobs across all samples")
+    parser.add_argument("--full", action="store_true", help="Re-score every sample instead of only changed ones")
+    parser.add_argument("--stream", metavar="PATH", help="Score a JSON/JSONL testset lazily in checkpointed batches")
+    parser.add_argument("--checkpoint", metavar="PATH", help="Checkpoint file for --stream (default results/checkpoints/<name>.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Samples per streamed batch")
+    parser.add_argument("--restart", action="store_true", help="Discard an existing checkpoint instead of resuming")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="With --stream, write results even if some samples got no RAG answer (counted as skipped)")
+    return parser
+
+
+def cli(argv=None):
+    args = build_parser().parse_args(argv)
+    asyncio.run(main(concurrency=args.concurrency, timeout=args.timeout, deadline=args.deadline,
+                     judge_concurrency=args.judge_concurrency, full=args.full, stream=args.stream,
+                     checkpoint=args.checkpoint, batch_size=args.batch_size, restart=args.restart,
+                     allow_missing=args.allow_missing))
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    cli()
@@ -0,0 +1,203 @@
+import os
+import csv
+import json
+import math
+from datetime import datetime
+
+from results_store import sample_id, details_table, sample_costs_table
+from telemetry import CostAccumulator, spend_line
+
+CHUNK_SIZE = 1 << 16
+# Rows per Parquet row group when copying a checkpoint into the results store
+STORE_BATCH_ROWS = 1000
+# Checkpoint row field holding the sample's JobStats dicts; folded into the cost summary, never written as a column
+JOBS_KEY = "_jobs"
+
+
+def iter_json_items(path):
+    """Yield items one at a time from a JSON array file or a JSONL file.
+
+    JSON arrays are decoded incrementally with ``raw_decode`` over a sliding
+    buffer, so only one item (plus one read chunk) is held in memory.
+    """
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buffer = f.read(CHUNK_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array")
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def normalize_item(item):
+    """Map generated testset rows (user_input/reference) onto the Test5/Test6 item shape"""
+    if "question" not in item and "conversation" not in item and isinstance(item.get("user_input"), str):
+        item = dict(item, question=item["user_input"])
+    if "answer" not in item and "response" in item:
+        # A testset that already carries the RAG output
+        item = dict(item, answer=item["response"])
+    return item
+
+
+# Raw conversation roles kept by to_sample, as ragas message types
+MESSAGE_TYPES = {"user": "human", "assistant": "ai"}
+
+
+def item_id(item):
+    """The results store's sample_id for a raw item, computed before its RAG answer is fetched"""
+    if "conversation" in item:
+        messages = [{"type": MESSAGE_TYPES[m["role"]], "content": m["content"]}
+                    for m in item["conversation"] if m["role"] in MESSAGE_TYPES]
+        return sample_id(messages, item.get("reference"))
+    return sample_id(item.get("question"), item.get("reference"))
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    """Append-only JSONL of finished per-sample result rows.
+
+    Every appended batch is flushed and fsync'd, so a crash loses at most
+    the batch in flight. On open, a torn last line from a crash mid-write
+    is cut off and the IDs of finished samples are loaded for resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            self._repair()
+            for row in self.rows():
+                self.done.add(row["sample_id"])
+        self._file = open(path, "a")
+
+    def _repair(self):
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def append(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            self.done.add(row["sample_id"])
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def rows(self):
+        """Iterate stored rows without loading the file"""
+        with open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def remove(self):
+        self.close()
+        os.remove(self.path)
+
+
+def _csv_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, (list, dict)):
+        return str(value)
+    return value
+
+
+def write_results_streaming(checkpoint, metric_names, total_samples, results_dir, run_id, store=None, skipped=0):
+    """Write *_details.csv, *_summary.json and the results store from a checkpoint in constant memory.
+
+    Cost/latency comes from the jobs stored with each checkpoint row, so
+    batches scored before a resume are counted too. It is folded into
+    running totals while the rows are copied, and per-sample costs go
+    straight to the store.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+
+    # First pass: column union (single- and multi-turn rows have different fields)
+    columns = []
+    for row in checkpoint.rows():
+        columns.extend(k for k in row if k not in columns and k != JOBS_KEY)
+    sample_columns = [c for c in columns if c not in metric_names]
+    columns = sample_columns + [m for m in metric_names if m in columns] + ["run_id"]
+
+    sums = dict.fromkeys(metric_names, 0.0)
+    counts = dict.fromkeys(metric_names, 0)
+    csv_path = os.path.join(results_dir, f"{run_id}_details.csv")
+    costs = CostAccumulator()
+    parquet = store.details_writer(run_id, metric_names) if store is not None else None
+    cost_parquet = store.sample_costs_writer(run_id) if store is not None else None
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for rows in batched(checkpoint.rows(), STORE_BATCH_ROWS):
+            jobs = []
+            for row in rows:
+                jobs.extend(dict(job, sample_id=row["sample_id"]) for job in row.pop(JOBS_KEY, []))
+                row["run_id"] = run_id
+                for name in metric_names:
+                    value = row.get(name)
+                    if isinstance(value, (int, float)) and not math.isnan(value):
+                        sums[name] += value
+                        counts[name] += 1
+                writer.writerow({c: _csv_value(row.get(c)) for c in columns})
+            sample_costs = costs.add(jobs)
+            if parquet is not None:
+                parquet.write_table(details_table(rows, metric_names, run_id))
+                cost_parquet.write_table(sample_costs_table(sample_costs, run_id))
+    if parquet is not None:
+        parquet.close()
+        cost_parquet.close()
+    print(f"💾 Saved detailed results to {csv_path}")
+    cost_latency = costs.summary()
+    print(spend_line(cost_latency))
+
+    summary = {name: sums[name] / counts[name] for name in metric_names if counts[name]}
+    summary["run_id"] = run_id
+    summary["timestamp"] = datetime.now().isoformat()
+    summary["total_samples"] = total_samples
+    if skipped:
+        summary["skipped"] = skipped
+    summary["cost_latency"] = cost_latency
+
+    json_path = os.path.join(results_dir, f"{run_id}_summary.json")
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    print(f"💾 Saved summary to {json_path}")
+
+    if store is not None:
+        store.append_run(summary)
+        print(f"🗃️ Recorded run {run_id} in {store.root}")
+    return csv_path, json_path
@@ -0,0 +1,219 @@
+import os
+import json
+import asyncio
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+import httpx
+
+# Default on-disk location for all local caches (git-ignored)
+CACHE_DIR = os.getenv("RAGAS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# Only completion endpoints carry judge verdicts worth caching
+CACHEABLE_PATHS = ("/chat/completions", "/completions")
+
+# Seconds a writer waits for another process's write lock before giving up
+BUSY_TIMEOUT = 30.0
+
+# Request fields that never change the model output
+VOLATILE_FIELDS = {"user", "metadata", "store", "stream_options"}
+
+
+def cache_enabled():
+    """Caching is on unless RAGAS_CACHE is set to 0/off/false"""
+    return os.getenv("RAGAS_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+
+def request_cache_key(request, paths=CACHEABLE_PATHS):
+    """Hash the model name, prompt and sampling parameters of a completion request.
+
+    Returns None for requests that should bypass the cache (non-POST,
+    endpoints outside `paths`, streamed responses or unparsable bodies).
+    """
+    if request.method != "POST" or not request.url.path.endswith(paths):
+        return None
+    try:
+        body = json.loads(request.read() or b"{}")
+    except ValueError:
+        return None
+    if body.get("stream"):
+        return None
+
+    payload = {k: v for k, v in body.items() if k not in VOLATILE_FIELDS}
+    payload["_endpoint"] = f"{request.url.host}{request.url.path}"
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest(), body.get("model", "")
+
+
+class ResponseCache:
+    """Content-addressed SQLite store for LLM responses with size/age eviction.
+
+    Entries are keyed by ``request_cache_key`` and hold the zlib-compressed
+    response body. Entries older than ``max_age_days`` are dropped and, once
+    the store grows past ``max_bytes``, the least recently used entries go first.
+    """
+
+    EVICT_EVERY = 256
+
+    def __init__(self, path=None, max_bytes=None, max_age_days=None):
+        self.path = path or os.path.join(CACHE_DIR, "llm_cache.sqlite")
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("RAGAS_CACHE_MAX_MB", "512")) * 1024 * 1024
+        self.max_age = (max_age_days if max_age_days is not None else float(os.getenv("RAGAS_CACHE_MAX_AGE_DAYS", "30"))) * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # WAL lets pytest-xdist workers read while one writes; writers queue on the busy timeout
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self.evict()
+
+    def get(self, key):
+        """Return the cached body for ``key`` or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0])
+
+    def put(self, key, body, model=""):
+        """Store a response body under ``key``"""
+        blob = zlib.compress(body)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, body, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now),
+            )
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then LRU entries until under the size budget"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age,))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Free down to 90% of the budget so we don't evict on every insert
+            excess = total - int(self.max_bytes * 0.9)
+            stale = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                stale.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self):
+        """Entry count and stored bytes"""
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Process-wide cache shared by the pytest fixtures and the evaluation CLI"""
+    global _default_cache
+    if not cache_enabled():
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def _cached_response(request, body):
+    return httpx.Response(200, headers={"content-type": "application/json", "x-ragas-cache": "hit"}, content=body, request=request)
+
+
+class CachingTransport(httpx.BaseTransport):
+    """httpx transport that serves repeated completion requests from a ResponseCache"""
+
+    def __init__(self, cache, transport=None):
+        self.cache = cache
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        keyed = request_cache_key(request)
+        if keyed is None:
+            return self.transport.handle_request(request)
+        key, model = keyed
+        body = self.cache.get(key)
+        if body is not None:
+            return _cached_response(request, body)
+
+        response = self.transport.handle_request(request)
+        if response.status_code != 200:
+            return response
+        body = response.read()
+        response.close()
+        self.cache.put(key, body, model)
+        return httpx.Response(200, headers={"content-type": "application/json"}, content=body, request=request)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncCachingTransport(httpx.AsyncBaseTransport):
+    """Async variant of CachingTransport for AsyncOpenAI clients"""
+
+    def __init__(self, cache, transport=None):
+        self.cache = cache
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        keyed = request_cache_key(request)
+        if keyed is None:
+            return await self.transport.handle_async_request(request)
+        key, model = keyed
+        # SQLite calls block (busy timeout, fsync): keep them off the event loop
+        body = await asyncio.to_thread(self.cache.get, key)
+        if body is not None:
+            return _cached_response(request, body)
+
+        response = await self.transport.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+        body = await response.aread()
+        await response.aclose()
+        await asyncio.to_thread(self.cache.put, key, body, model)
+        return httpx.Response(200, headers={"content-type": "application/json"}, content=body, request=request)
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,80 @@
+import os
+from urllib.parse import urlparse
+
+import httpx
+from openai import AsyncOpenAI, OpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+from openai._constants import DEFAULT_CONNECTION_LIMITS
+
+from llm_cache import get_default_cache, CachingTransport, AsyncCachingTransport
+from rate_limiter import get_default_limiters, RateLimitedTransport, AsyncRateLimitedTransport
+from single_flight import single_flight_enabled, SingleFlightTransport, AsyncSingleFlightTransport
+from telemetry import InstrumentedTransport, AsyncInstrumentedTransport
+
+JUDGE_MODEL = "gpt-4o"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+def get_api_key():
+    """Read the OpenAI key from the environment"""
+    apikey = os.getenv("OPENAI_API_KEY")
+    if not apikey:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    return apikey
+
+
+def uses_local_openai():
+    """True when OPENAI_BASE_URL points at a loopback stand-in such as local_servers.py"""
+    base_url = os.getenv("OPENAI_BASE_URL")
+    return bool(base_url) and urlparse(base_url).hostname in LOOPBACK_HOSTS
+
+
+def build_async_http_client(cache=None, limiters=None):
+    """httpx client for AsyncOpenAI: telemetry, single-flight, judge cache, the shared rate limiter, then the network"""
+    cache = cache or get_default_cache()
+    limiters = limiters or get_default_limiters()
+    transport = httpx.AsyncHTTPTransport(limits=DEFAULT_CONNECTION_LIMITS)
+    # Cache hits never reach the limiter, so they cost no quota
+    if limiters is not None:
+        transport = AsyncRateLimitedTransport(limiters, transport)
+    if cache is not None:
+        transport = AsyncCachingTransport(cache, transport)
+    # Outermost: concurrent duplicates would all miss the cache, so merge them first
+    if single_flight_enabled():
+        transport = AsyncSingleFlightTransport(transport)
+    # Sees every call as its caller did, cache hits included, and charges it to the current scoring job
+    transport = AsyncInstrumentedTransport(transport)
+    return DefaultAsyncHttpxClient(transport=transport)
+
+
+def build_http_client(cache=None, limiters=None):
+    """Sync counterpart of build_async_http_client"""
+    cache = cache or get_default_cache()
+    limiters = limiters or get_default_limiters()
+    transport = httpx.HTTPTransport(limits=DEFAULT_CONNECTION_LIMITS)
+    if limiters is not None:
+        transport = RateLimitedTransport(limiters, transport)
+    if cache is not None:
+        transport = CachingTransport(cache, transport)
+    if single_flight_enabled():
+        transport = SingleFlightTransport(transport)
+    transport = InstrumentedTransport(transport)
+    return DefaultHttpxClient(transport=transport)
+
+
+def build_async_openai(api_key=None, cache=None, limiters=None):
+    """AsyncOpenAI client whose completions go through the on-disk judge cache and shared limiter"""
+    return AsyncOpenAI(api_key=api_key or get_api_key(), http_client=build_async_http_client(cache, limiters))
+
+
+def build_openai(api_key=None, cache=None, limiters=None):
+    """Sync OpenAI client whose completions go through the on-disk judge cache and shared limiter"""
+    return OpenAI(api_key=api_key or get_api_key(), http_client=build_http_client(cache, limiters))
+
+
+def build_judge_llm(model=JUDGE_MODEL, client=None):
+    """ragas judge LLM backed by a cached OpenAI client"""
+    from ragas.llms import llm_factory
+
+    return llm_factory(model, client=client or build_async_openai())
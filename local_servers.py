@@ -0,0 +1,377 @@
+"""Local stand-ins for the RAG `/ask` endpoint and the OpenAI API.
+
+Lets the test suite, run_eval and the benchmarks run with no network:
+
+    python local_servers.py --rag-port 8765 --openai-port 8766 --latency-ms 20
+
+then, in another shell, export the printed RAG_ENDPOINT / OPENAI_BASE_URL /
+OPENAI_API_KEY values. The RAG stub answers from testdata/ with optional
+latency and error injection. The fake OpenAI server returns deterministic,
+schema-valid judge outputs and hash-seeded embeddings.
+"""
+import re
+import sys
+import json
+import time
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import get_fallback_store
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid the 40ms delayed-ACK stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("content-length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_faults(self):
+        """Sleep for the configured latency; return True if this request should fail"""
+        server = self.server
+        delay = server.latency_ms + server.rng.uniform(0, server.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000.0)
+        if server.error_rate and server.rng.random() < server.error_rate:
+            server.count("errors")
+            self._send_json(503, {"error": {"message": "injected failure", "type": "server_error"}})
+            return True
+        return False
+
+
+# ===============================
+# RAG /ask stub
+# ===============================
+class RagStubHandler(_Handler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/ask"):
+            self._send_json(404, {"detail": "Not Found"})
+            return
+        self.server.count("ask")
+        # Always drain the body first so keep-alive connections stay in sync
+        question = self._read_json().get("question", "")
+        if self._inject_faults():
+            return
+        self._send_json(200, self.server.answer(question))
+
+
+class RagStubServer(ThreadingHTTPServer):
+    """Serves `/ask` from the captured responses in testdata/"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0):
+        super().__init__(address, RagStubHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.store = get_fallback_store()
+        self.stats = {}
+        self._lock = threading.Lock()
+        # Unknown questions get the first captured retrieval so contexts stay realistic
+        first = next(iter(self.store.data.values()), {"retrieved_docs": []})
+        self._default_docs = first.get("retrieved_docs", [])
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def answer(self, question):
+        response = self.store.lookup(question, fuzzy=True)
+        if response is not None:
+            return response
+        return {"answer": f"Stub answer for: {question}", "retrieved_docs": self._default_docs}
+
+
+# ===============================
+# Fake OpenAI API
+# ===============================
+def _resolve(schema, defs):
+    while "$ref" in schema:
+        schema = defs.get(schema["$ref"].split("/")[-1], {})
+    return schema
+
+
+def fake_instance(schema, defs=None, name="", seed=""):
+    """Build a deterministic value that validates against a JSON schema"""
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    schema = _resolve(schema, defs)
+
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if _resolve(s, defs).get("type") != "null"] or schema[key]
+            return fake_instance(options[0], defs, name, seed)
+    if "allOf" in schema:
+        return fake_instance(schema["allOf"][0], defs, name, seed)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    if kind is None:
+        kind = "object" if "properties" in schema else "string"
+
+    if kind == "object":
+        props = schema.get("properties", {})
+        return {key: fake_instance(sub, defs, key, seed) for key, sub in props.items()}
+    if kind == "array":
+        count = max(1, schema.get("minItems", 1))
+        return [fake_instance(schema.get("items", {}), defs, name, f"{seed}{i}") for i in range(count)]
+    # Judges answer "yes" everywhere except for flags that penalise the answer
+    negative = any(word in name.lower() for word in ("noncommittal", "refus"))
+    if kind == "boolean":
+        return not negative
+    if kind in ("integer", "number"):
+        value = 0 if negative else 1
+        value = max(schema.get("minimum", value), min(schema.get("maximum", value), value))
+        return int(value) if kind == "integer" else float(value)
+    digest = hashlib.sha256(f"{seed}:{name}".encode("utf-8")).hexdigest()[:8]
+    return f"{name or 'text'} {digest}"
+
+
+_SCHEMA_MARKER = re.compile(r"schema", re.IGNORECASE)
+
+
+def find_schema(text):
+    """First JSON schema object embedded in a prompt, or None"""
+    decoder = json.JSONDecoder()
+    starts = [text.find("{", m.end()) for m in _SCHEMA_MARKER.finditer(text)]
+    for start in starts:
+        if start < 0:
+            continue
+        try:
+            obj, _ = decoder.raw_decode(text, start)
+        except ValueError:
+            continue
+        if isinstance(obj, dict) and ("properties" in obj or "$defs" in obj):
+            return obj
+    return None
+
+
+def _message_text(messages):
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def fake_embedding(text, dimensions=EMBEDDING_DIMENSIONS):
+    """Unit vector seeded by the text hash"""
+    seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def _tokens(text):
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIHandler(_Handler):
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        body = self._read_json()
+        if path.endswith("/chat/completions"):
+            self.server.count("chat")
+            if not self._inject_faults():
+                self._send_json(200, self.server.chat(body))
+        elif path.endswith("/embeddings"):
+            self.server.count("embeddings")
+            if not self._inject_faults():
+                self._send_json(200, self.server.embed(body))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """OpenAI-compatible chat/embeddings server with deterministic outputs"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def chat(self, body):
+        messages = body.get("messages", [])
+        prompt = _message_text(messages)
+        seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+        tool = None
+        if body.get("tools"):
+            tool = body["tools"][0]["function"]
+            schema = tool.get("parameters", {})
+        elif (body.get("response_format") or {}).get("type") == "json_schema":
+            schema = body["response_format"]["json_schema"].get("schema", {})
+        else:
+            schema = find_schema(prompt)
+
+        if schema is not None:
+            content = json.dumps(fake_instance(schema, seed=seed))
+        else:
+            content = f"Deterministic reply {seed}"
+
+        message = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+        if tool is not None:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{seed}",
+                    "type": "function",
+                    "function": {"name": tool["name"], "arguments": content},
+                }],
+            }
+            finish_reason = "tool_calls"
+
+        prompt_tokens, completion_tokens = _tokens(prompt), _tokens(content)
+        self.count("prompt_tokens", prompt_tokens)
+        self.count("completion_tokens", completion_tokens)
+        return {
+            "id": f"chatcmpl-{seed}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "fake"),
+            "choices": [
+                {"index": i, "message": message, "finish_reason": finish_reason, "logprobs": None}
+                for i in range(body.get("n") or 1)
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def embed(self, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+        data = []
+        for i, item in enumerate(inputs):
+            vec = fake_embedding(item, dimensions)
+            if body.get("encoding_format") == "base64":
+                vec = base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vec})
+        tokens = sum(_tokens(str(item)) for item in inputs)
+        self.count("embedding_inputs", len(inputs))
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+
+# ===============================
+# In-process helpers
+# ===============================
+class LocalStack:
+    """Both stand-in servers running on background threads"""
+
+    def __init__(self, host="127.0.0.1", rag_port=0, openai_port=0, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, llm_latency_ms=0, seed=0):
+        self.rag = RagStubServer((host, rag_port), latency_ms, jitter_ms, error_rate, seed)
+        self.openai = FakeOpenAIServer((host, openai_port), llm_latency_ms, jitter_ms, 0.0, seed)
+        self._threads = [
+            threading.Thread(target=server.serve_forever, daemon=True) for server in (self.rag, self.openai)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def rag_endpoint(self):
+        host, port = self.rag.server_address[:2]
+        return f"http://{host}:{port}/ask"
+
+    @property
+    def openai_base_url(self):
+        host, port = self.openai.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def env(self):
+        """Environment variables that point the project at this stack"""
+        return {
+            "RAG_ENDPOINT": self.rag_endpoint,
+            "OPENAI_BASE_URL": self.openai_base_url,
+            "OPENAI_API_KEY": "sk-local-fake",
+        }
+
+    def stop(self):
+        for server in (self.rag, self.openai):
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run local stand-ins for the RAG endpoint and OpenAI API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--rag-port", type=int, default=8765)
+    parser.add_argument("--openai-port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per /ask request")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Added latency per OpenAI request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform random extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of /ask requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stack = LocalStack(args.host, args.rag_port, args.openai_port, args.latency_ms, args.jitter_ms,
+                       args.error_rate, args.llm_latency_ms, args.seed)
+    print("🧪 Local stack running. Point the project at it with:")
+    for key, value in stack.env().items():
+        print(f"  export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stack.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,458 @@
+import os
+import copy
+import json
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from single_flight import SingleFlight, single_flight_enabled
+
+RAG_ENDPOINT = "https://rahulshettyacademy.com/rag-llm/ask"
+
+# Status codes worth another attempt; anything else non-200 is final
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+CASSETTE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "cassettes", "rag_responses.jsonl")
+
+
+class RagEndpointError(Exception):
+    """The RAG endpoint could not produce an answer"""
+
+
+class CircuitOpenError(RagEndpointError):
+    """The endpoint is known to be down; the call was not attempted"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, attempts=3, base_delay=0.25, max_delay=4.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Sleep before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Stops calling an endpoint after repeated failures.
+
+    After `failure_threshold` consecutive failed attempts the circuit opens
+    and every call fails fast for `reset_timeout` seconds. The first call
+    after that is let through as a probe: success closes the circuit,
+    failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """True if a call may be attempted now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+def _payload(question, chat_history):
+    return {"question": question, "chat_history": chat_history or []}
+
+
+class Cassette:
+    """Append-only JSONL log of `/ask` request/response pairs.
+
+    In "record" mode every live answer is appended as one compact line.
+    In "replay" mode answers are served from an in-memory index built from
+    the file and the network is never touched; unknown requests raise
+    RagEndpointError so callers fall back as if the endpoint were down.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, path=None, mode="replay"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path or CASSETTE_PATH
+        self.mode = mode
+        self.index = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.index[self.key(entry["request"])] = entry["response"]
+
+    @staticmethod
+    def key(payload):
+        return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+    def replay(self, payload):
+        """Recorded response for `payload`; raises RagEndpointError if absent"""
+        try:
+            return copy.deepcopy(self.index[self.key(payload)])
+        except KeyError:
+            raise RagEndpointError(f"No recorded response for: {payload['question']}")
+
+    def record(self, payload, response):
+        """Append a live response unless an identical request is already recorded"""
+        key = self.key(payload)
+        with self._lock:
+            if key in self.index:
+                return
+            self.index[key] = response
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"request": payload, "response": response}, separators=(",", ":")) + "\n")
+
+
+class SharedAnswerCache:
+    """SQLite (WAL) store of `/ask` answers shared by every process of a run.
+
+    Lets pytest-xdist workers ask each question once between them: the first
+    caller takes a lease on the request and fetches it, the others poll until
+    the answer lands (or the lease expires, e.g. because its owner crashed,
+    and one of them takes over). A failed fetch is remembered for
+    `failure_seconds`, so waiters fail with it instead of each retrying the
+    endpoint in turn.
+    """
+
+    def __init__(self, path, lease_seconds=60.0, poll_interval=0.05, failure_seconds=10.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.failure_seconds = failure_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS failures (key TEXT PRIMARY KEY, error TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    @staticmethod
+    def key(endpoint, payload):
+        return endpoint + " " + Cassette.key(payload)
+
+    def get(self, key):
+        """Stored answer for `key`, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM answers WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, response):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO answers (key, response) VALUES (?, ?)",
+                               (key, json.dumps(response, separators=(",", ":"))))
+            self._conn.execute("DELETE FROM failures WHERE key = ?", (key,))
+
+    def failure(self, key):
+        """Error message of a recent failed fetch of `key`, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT error FROM failures WHERE key = ? AND expires_at >= ?",
+                                     (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def put_failure(self, key, error):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO failures (key, error, expires_at) VALUES (?, ?, ?)",
+                               (key, str(error), time.time() + self.failure_seconds))
+
+    def claim(self, key):
+        """Lease token if this caller should fetch `key`, None if someone else already is"""
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            claimed = self._conn.execute("INSERT OR IGNORE INTO leases (key, token, expires_at) VALUES (?, ?, ?)",
+                                         (key, token, now + self.lease_seconds)).rowcount
+        return token if claimed else None
+
+    def release(self, key, token):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND token = ?", (key, token))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Cassette selected by RAG_CASSETTE=record|replay (path: RAG_CASSETTE_PATH), else None"""
+    global _cassette
+    mode = os.getenv("RAG_CASSETTE", "").lower()
+    if mode not in Cassette.MODES:
+        return None
+    path = os.getenv("RAG_CASSETTE_PATH") or CASSETTE_PATH
+    with _cassette_lock:
+        if _cassette is None or _cassette.mode != mode or _cassette.path != path:
+            _cassette = Cassette(path, mode)
+        return _cassette
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """SharedAnswerCache at RAG_SHARED_CACHE (a file path), else None.
+
+    The pytest plugin in sharding.py points this at a fresh file per run, so
+    workers share answers within a run but never serve last run's answers.
+    """
+    global _shared
+    path = os.getenv("RAG_SHARED_CACHE")
+    if not path:
+        return None
+    with _shared_lock:
+        if _shared is None or _shared.path != path:
+            _shared = SharedAnswerCache(path)
+        return _shared
+
+
+class RagClient:
+    """Keep-alive, retrying client for the RAG `/ask` endpoint"""
+
+    def __init__(self, endpoint=None, timeout=5.0, retry=None, breaker=None, pool_size=10, cassette=None, shared=None):
+        self.endpoint = endpoint or os.getenv("RAG_ENDPOINT") or RAG_ENDPOINT
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.cassette = cassette if cassette is not None else get_cassette()
+        self.shared = shared if shared is not None else get_shared_cache()
+        self.flight = SingleFlight() if single_flight_enabled() else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def ask(self, question, chat_history=None):
+        """POST a question and return the decoded JSON answer"""
+        payload = _payload(question, chat_history)
+        if self.cassette is not None and self.cassette.mode == "replay":
+            return self.cassette.replay(payload)
+        if self.flight is None:
+            return self._ask(payload)
+        # Concurrent askers of one question share a request; each gets its own copy to mutate
+        return copy.deepcopy(self.flight.do(Cassette.key(payload), lambda: self._ask(payload)))
+
+    def _ask(self, payload):
+        if self.shared is None:
+            return self._fetch(payload)
+
+        # Another process may already have (or be fetching) this answer
+        key = self.shared.key(self.endpoint, payload)
+        while True:
+            answer = self.shared.get(key)
+            if answer is not None:
+                return answer
+            error = self.shared.failure(key)
+            if error is not None:
+                # The last fetch just failed; repeating it per waiter would only multiply the wait
+                raise RagEndpointError(error)
+            token = self.shared.claim(key)
+            if token is not None:
+                try:
+                    answer = self._fetch(payload)
+                except RagEndpointError as e:
+                    self.shared.put_failure(key, e)
+                    raise
+                else:
+                    self.shared.put(key, answer)
+                    return answer
+                finally:
+                    self.shared.release(key, token)
+            time.sleep(self.shared.poll_interval)
+
+    def _fetch(self, payload):
+        last_error = None
+        for attempt in range(1, self.retry.attempts + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self.endpoint}")
+            # Every attempt ends in exactly one breaker record, or a half-open probe would stay claimed forever
+            succeeded = False
+            try:
+                response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+                if response.status_code == 200:
+                    answer = response.json()
+                    succeeded = True
+                    return self._recorded(payload, answer)
+                last_error = RagEndpointError(f"API returned status code {response.status_code}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    # The endpoint is up, it just rejected this request
+                    succeeded = True
+                    raise last_error
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = e
+            except ValueError as e:
+                last_error = RagEndpointError(f"API returned invalid JSON: {e}")
+            finally:
+                if succeeded:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+            if attempt < self.retry.attempts:
+                time.sleep(self.retry.delay(attempt))
+        raise RagEndpointError(f"RAG endpoint failed after {self.retry.attempts} attempts: {last_error}")
+
+    def _recorded(self, payload, answer):
+        if self.cassette is not None and self.cassette.mode == "record":
+            self.cassette.record(payload, answer)
+        return answer
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncRagClient:
+    """asyncio counterpart of RagClient, backed by a pooled httpx.AsyncClient"""
+
+    def __init__(self, endpoint=None, timeout=5.0, retry=None, breaker=None, max_connections=10, cassette=None, shared=None):
+        self.endpoint = endpoint or os.getenv("RAG_ENDPOINT") or RAG_ENDPOINT
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.cassette = cassette if cassette is not None else get_cassette()
+        self.shared = shared if shared is not None else get_shared_cache()
+        self.flight = SingleFlight() if single_flight_enabled() else None
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    async def ask(self, question, chat_history=None):
+        """POST a question and return the decoded JSON answer"""
+        payload = _payload(question, chat_history)
+        if self.cassette is not None and self.cassette.mode == "replay":
+            return self.cassette.replay(payload)
+        if self.flight is None:
+            return await self._ask(payload)
+        return copy.deepcopy(await self.flight.ado(Cassette.key(payload), lambda: self._ask(payload)))
+
+    async def _ask(self, payload):
+        if self.shared is None:
+            return await self._fetch(payload)
+
+        # SQLite calls block (busy timeout while another worker writes): keep them off the event loop
+        key = self.shared.key(self.endpoint, payload)
+        while True:
+            answer = await asyncio.to_thread(self.shared.get, key)
+            if answer is not None:
+                return answer
+            error = await asyncio.to_thread(self.shared.failure, key)
+            if error is not None:
+                raise RagEndpointError(error)
+            token = await asyncio.to_thread(self.shared.claim, key)
+            if token is not None:
+                try:
+                    answer = await self._fetch(payload)
+                except RagEndpointError as e:
+                    await asyncio.to_thread(self.shared.put_failure, key, e)
+                    raise
+                else:
+                    await asyncio.to_thread(self.shared.put, key, answer)
+                    return answer
+                finally:
+                    await asyncio.to_thread(self.shared.release, key, token)
+            await asyncio.sleep(self.shared.poll_interval)
+
+    async def _fetch(self, payload):
+        last_error = None
+        for attempt in range(1, self.retry.attempts + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self.endpoint}")
+            # Cancellation (e.g. the caller's deadline) also counts as a failure, releasing a half-open probe
+            succeeded = False
+            try:
+                response = await self.client.post(self.endpoint, json=payload)
+                if response.status_code == 200:
+                    answer = response.json()
+                    succeeded = True
+                    return self._recorded(payload, answer)
+                last_error = RagEndpointError(f"API returned status code {response.status_code}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    succeeded = True
+                    raise last_error
+            except httpx.TransportError as e:
+                last_error = e
+            except ValueError as e:
+                last_error = RagEndpointError(f"API returned invalid JSON: {e}")
+            finally:
+                if succeeded:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+            if attempt < self.retry.attempts:
+                await asyncio.sleep(self.retry.delay(attempt))
+        raise RagEndpointError(f"RAG endpoint failed after {self.retry.attempts} attempts: {last_error}")
+
+    _recorded = RagClient._recorded
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+# One breaker per process so sync and async callers share what they learn
+_breaker = CircuitBreaker()
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_breaker():
+    return _breaker
+
+
+def get_rag_client():
+    """Process-wide RagClient reused by every sync caller"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RagClient(breaker=_breaker)
+        return _client
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import asyncio
+import threading
+
+import httpx
+
+# Per-model (requests/min, tokens/min) defaults at OpenAI usage tier 2;
+# set RAGAS_RPM_LIMIT / RAGAS_TPM_LIMIT to match your organisation's quota
+DEFAULT_LIMITS = {
+    "gpt-4o": (5000, 450000),
+    "text-embedding-3-small": (5000, 1000000),
+}
+FALLBACK_LIMITS = (500, 200000)
+
+# Rough English average; good enough to keep bursts under the TPM ceiling
+CHARS_PER_TOKEN = 4
+# Completion budget assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+def rate_limit_enabled():
+    """Limiting is on unless RAGAS_RATE_LIMIT is set to 0/off/false"""
+    return os.getenv("RAGAS_RATE_LIMIT", "on").lower() not in ("0", "off", "false", "no")
+
+
+def _text_tokens(value):
+    if isinstance(value, str):
+        return len(value) // CHARS_PER_TOKEN + 1
+    if isinstance(value, list):
+        if value and all(isinstance(v, int) for v in value):
+            # Already tokenized: LangChain sends tiktoken ids when it checks the context length
+            return len(value)
+        return sum(_text_tokens(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_text_tokens(v) for k, v in value.items() if k not in ("role", "type", "name"))
+    return 0
+
+
+def estimate_tokens(body):
+    """Prompt tokens plus the completion budget of an OpenAI request body"""
+    if "input" in body:
+        # Embeddings: only the input counts
+        return _text_tokens(body["input"])
+    prompt = _text_tokens(body.get("messages") or body.get("prompt") or "")
+    prompt += _text_tokens(body.get("tools") or []) + _text_tokens(body.get("response_format") or {})
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    # "n": null is valid and means 1
+    return prompt + completion * (body.get("n") or 1)
+
+
+def parse_request(request):
+    """(model, estimated tokens) for an OpenAI request"""
+    try:
+        body = json.loads(request.read() or b"{}")
+    except ValueError:
+        return "", 1
+    return body.get("model", ""), estimate_tokens(body)
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most one minute of quota"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` is available (0 if it is now)"""
+        self._refill(now)
+        # A single request larger than the bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, remaining, now):
+        """Trust the server's view of remaining quota when it is lower than ours"""
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+
+
+class AdaptiveLimiter:
+    """Request/token-rate limiter with AIMD concurrency for one model.
+
+    Each request first waits for a free concurrency slot and for enough
+    room in both the requests-per-minute and tokens-per-minute buckets,
+    using an up-front token estimate. The concurrency limit grows by one
+    per window of successful requests and is halved on a 429 or a reply
+    slower than ``latency_target``; a ``Retry-After`` pauses every caller.
+    OpenAI's ``x-ratelimit-remaining-*`` headers resync the buckets.
+
+    State is guarded by a thread lock rather than asyncio primitives so one
+    limiter can be shared by sync clients and by async clients running on
+    different event loops (pytest creates one loop per test).
+    """
+
+    def __init__(self, rpm, tpm, max_concurrency=64, initial_concurrency=8, latency_target=30.0, min_concurrency=1,
+                 decrease_interval=1.0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.latency_target = latency_target
+        self.decrease_interval = decrease_interval
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def _try_acquire(self, tokens, wake):
+        """Take a slot and quota if possible; otherwise return how long to wait.
+
+        None means "until a slot frees": `wake` is then registered under the
+        same lock so a release racing with this check cannot be missed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.limit):
+                self._waiters.append(wake)
+                return None
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self, tokens):
+        """Block the calling thread until the request may be sent"""
+        while True:
+            event = threading.Event()
+            wait = self._try_acquire(tokens, event.set)
+            if wait == 0.0:
+                return
+            if wait is None:
+                event.wait()
+            else:
+                time.sleep(wait)
+
+    async def aacquire(self, tokens):
+        """Wait without blocking the event loop until the request may be sent"""
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+
+            def wake(future=future):
+                try:
+                    loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+                except RuntimeError:
+                    # The waiter's event loop has already been closed
+                    pass
+
+            wait = self._try_acquire(tokens, wake)
+            if wait == 0.0:
+                return
+            if wait is None:
+                await future
+            else:
+                await asyncio.sleep(wait)
+
+    def release(self, status_code=None, latency=0.0, headers=None):
+        """Free the slot and adapt the concurrency limit from the outcome"""
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if status_code == 429 or latency > self.latency_target:
+                self._decrease(now)
+                if status_code == 429:
+                    self.throttled += 1
+                    self.blocked_until = max(self.blocked_until, now + _retry_after(headers))
+            elif status_code is not None and status_code < 400:
+                # Additive increase: about +1 per `limit` successful requests
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            if headers is not None:
+                self._sync(headers, now)
+            waiters, self._waiters = self._waiters, []
+        for wake in waiters:
+            wake()
+
+    def _decrease(self, now):
+        # A burst of 429s from requests sent together is one congestion signal, not many
+        if now - self.last_decrease < self.decrease_interval:
+            return
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        self.last_decrease = now
+
+    def _sync(self, headers, now):
+        for name, bucket in (("x-ratelimit-remaining-requests", self.requests), ("x-ratelimit-remaining-tokens", self.tokens)):
+            remaining = headers.get(name)
+            if remaining and remaining.isdigit():
+                bucket.sync(int(remaining), now)
+
+    def stats(self):
+        return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "throttled": self.throttled}
+
+
+def _retry_after(headers, default=1.0):
+    if headers is None:
+        return default
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return default
+
+
+class LimiterRegistry:
+    """One AdaptiveLimiter per model, created on first use"""
+
+    def __init__(self, limits=None, **limiter_kwargs):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.limiter_kwargs = limiter_kwargs
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, model):
+        with self._lock:
+            if model not in self.limiters:
+                rpm, tpm = self.limits.get(model, FALLBACK_LIMITS)
+                rpm = int(os.getenv("RAGAS_RPM_LIMIT", rpm))
+                tpm = int(os.getenv("RAGAS_TPM_LIMIT", tpm))
+                self.limiters[model] = AdaptiveLimiter(rpm, tpm, **self.limiter_kwargs)
+            return self.limiters[model]
+
+    def stats(self):
+        with self._lock:
+            return {model: limiter.stats() for model, limiter in self.limiters.items()}
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_limiters():
+    """Process-wide limiters shared by every OpenAI client the project builds"""
+    global _default_registry
+    if not rate_limit_enabled():
+        return None
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = LimiterRegistry(max_concurrency=int(os.getenv("RAGAS_MAX_CONCURRENCY", "64")))
+        return _default_registry
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """httpx transport that paces OpenAI requests through a LimiterRegistry"""
+
+    def __init__(self, limiters, transport=None):
+        self.limiters = limiters
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        model, tokens = parse_request(request)
+        limiter = self.limiters.get(model)
+        limiter.acquire(tokens)
+        start = time.monotonic()
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException:
+            limiter.release(latency=time.monotonic() - start)
+            raise
+        limiter.release(response.status_code, time.monotonic() - start, response.headers)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async variant of RateLimitedTransport for AsyncOpenAI clients"""
+
+    def __init__(self, limiters, transport=None):
+        self.limiters = limiters
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        model, tokens = parse_request(request)
+        limiter = self.limiters.get(model)
+        await limiter.aacquire(tokens)
+        start = time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            limiter.release(latency=time.monotonic() - start)
+            raise
+        limiter.release(response.status_code, time.monotonic() - start, response.headers)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,484 @@
+import os
+import ast
+import sys
+import glob
+import json
+import math
+import hashlib
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Fixed per-sample columns; metric columns (float64) follow, then run_id
+DETAIL_FIELDS = [
+    ("sample_id", pa.string()),
+    ("sample_type", pa.string()),
+    ("user_input", pa.string()),
+    ("response", pa.string()),
+    ("reference", pa.string()),
+    ("retrieved_contexts", pa.list_(pa.string())),
+    ("reference_contexts", pa.list_(pa.string())),
+    ("reference_topics", pa.list_(pa.string())),
+]
+HISTORY_KEYS = ("run_id", "timestamp", "total_samples", "skipped")
+
+# Per-(run, sample) cost row, see telemetry.CostAccumulator
+SAMPLE_COST_SCHEMA = pa.schema([
+    ("sample_id", pa.string()),
+    ("prompt_tokens", pa.int64()),
+    ("completion_tokens", pa.int64()),
+    ("cost_usd", pa.float64()),
+    ("latency_s", pa.float64()),
+    ("run_id", pa.string()),
+])
+
+# Per-metric statistics materialized once per run
+PERCENTILES = (10, 25, 50, 75, 90)
+FAILURE_THRESHOLDS = (0.3, 0.5, 0.7)
+
+
+def _messages(conversation):
+    """Multi-turn user_input reduced to what identifies it: message type and text"""
+    return [{"type": m.get("type"), "content": m.get("content")} for m in conversation]
+
+
+def sample_id(user_input, reference=None):
+    """Stable 16-hex-digit ID for a sample, derived from its input and reference only.
+
+    Responses, contexts and scores change between runs; the question being
+    asked does not, so the same sample gets the same ID in every run and
+    runs can be joined on it.
+    """
+    if isinstance(user_input, list):
+        user_input = _messages(user_input)
+    if isinstance(reference, float) and math.isnan(reference):
+        reference = None
+    key = json.dumps({"user_input": user_input, "reference": reference}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _strings(value):
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return None
+
+
+def _score(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def detail_schema(metric_names):
+    return pa.schema(DETAIL_FIELDS + [(m, pa.float64()) for m in metric_names] + [("run_id", pa.string())])
+
+
+def details_table(rows, metric_names, run_id):
+    """Arrow table with the fixed detail schema from result row dicts (sample.to_dict() + scores)"""
+    columns = {name: [] for name in detail_schema(metric_names).names}
+    for row in rows:
+        user_input = row.get("user_input")
+        columns["sample_id"].append(row.get("sample_id") or sample_id(user_input, row.get("reference")))
+        columns["sample_type"].append("multi_turn" if isinstance(user_input, list) else "single_turn")
+        columns["user_input"].append(_text(user_input))
+        columns["response"].append(_text(row.get("response")))
+        columns["reference"].append(_text(row.get("reference")))
+        for name in ("retrieved_contexts", "reference_contexts", "reference_topics"):
+            columns[name].append(_strings(row.get(name)))
+        for m in metric_names:
+            columns[m].append(_score(row.get(m)))
+        columns["run_id"].append(run_id)
+    return pa.table(columns, schema=detail_schema(metric_names))
+
+
+def metric_aggregates(values, thresholds=FAILURE_THRESHOLDS):
+    """count/mean/std/min/max, percentiles and below-threshold counts of one metric's scores (NaNs ignored)"""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    stats = {"count": int(values.size)}
+    if values.size:
+        stats.update(mean=float(values.mean()), std=float(values.std(ddof=1)) if values.size > 1 else 0.0,
+                     min=float(values.min()), max=float(values.max()))
+        for p, q in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            stats[f"p{p}"] = float(q)
+    for t in thresholds:
+        stats[f"failures_lt_{t}"] = int((values < t).sum())
+    return stats
+
+
+def sample_costs_table(sample_costs, run_id):
+    """Arrow table with the fixed sample-cost schema from {sample_id: costs}"""
+    rows = [dict(stats, sample_id=sid, run_id=run_id) for sid, stats in sample_costs.items()]
+    return pa.Table.from_pylist(rows, schema=SAMPLE_COST_SCHEMA)
+
+
+def _atomic_write_table(table, path):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+class ResultsStore:
+    """Columnar results store under ``results/store/``.
+
+    * ``history.parquet`` - one row per run (run_id, timestamp,
+      total_samples, metric means). Rows are only ever appended; the file
+      is rewritten atomically, which costs milliseconds for thousands of runs.
+    * ``details/run_id=<id>/part-*.parquet`` - Hive-partitioned per-sample
+      rows with a fixed schema and a stable ``sample_id``. A run's detail
+      query touches one directory and only the requested columns.
+    * ``aggregates.parquet`` - one row per (run, metric) with the
+      distribution statistics from ``metric_aggregates``, computed once
+      when the run is recorded so dashboards never rescan the details.
+    * ``cost_latency.parquet`` - the summary's ``cost_latency`` section
+      (see telemetry.py) as one row per (run, metric).
+    * ``sample_costs/run_id=<id>/part-0.parquet`` - tokens, cost and
+      latency per sample, partitioned like the details so a streamed run
+      can write them batch by batch. Only the store keeps these; summaries
+      carry the per-metric view.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(RESULTS_DIR, "store")
+        self.history_path = os.path.join(self.root, "history.parquet")
+        self.details_root = os.path.join(self.root, "details")
+        self.aggregates_path = os.path.join(self.root, "aggregates.parquet")
+        self.cost_latency_path = os.path.join(self.root, "cost_latency.parquet")
+        self.sample_costs_root = os.path.join(self.root, "sample_costs")
+        # Single-file layout used before sample costs were partitioned per run; still read
+        self.legacy_sample_costs_path = os.path.join(self.root, "sample_costs.parquet")
+        # Reentrant: append_run holds it across the per-run table writes, which take it too
+        self._lock = threading.RLock()
+
+    # -- writes ---------------------------------------------------------
+
+    def append_run(self, summary):
+        """Append one run's summary row to the history table (and its aggregates, if details are stored)"""
+        row = {k: v for k, v in summary.items() if isinstance(v, (str, int, float, bool)) or v is None}
+        with self._lock:
+            # Reject a duplicate before touching the per-run tables, so the recorded run's rows survive
+            self.check_new_run(row["run_id"])
+            history = self.history()
+            if self.has_details(row["run_id"]):
+                metric_names = [k for k, v in row.items() if k not in HISTORY_KEYS and isinstance(v, (int, float))]
+                self.write_aggregates(row["run_id"], metric_names)
+            if summary.get("cost_latency"):
+                self.write_cost_latency(row["run_id"], summary["cost_latency"])
+                if summary["cost_latency"].get("per_sample"):
+                    # Summaries written before per-sample costs moved out of them
+                    self.write_sample_costs(row["run_id"], summary["cost_latency"]["per_sample"])
+            history = pd.concat([history, pd.DataFrame([row])], ignore_index=True)
+            _atomic_write_table(pa.Table.from_pandas(history, preserve_index=False), self.history_path)
+
+    def check_new_run(self, run_id):
+        """Raise ValueError if `run_id` is already in the history table"""
+        history = self.history(columns=["run_id", "timestamp"])
+        if not history.empty and run_id in set(history["run_id"]):
+            raise ValueError(f"Run {run_id} is already in the history table")
+
+    def write_aggregates(self, run_id, metric_names):
+        """Compute per-metric statistics from the run's stored details (metric columns only)"""
+        available = self.detail_columns(run_id)
+        metric_names = [m for m in metric_names if m in available]
+        details = self.details(run_id, columns=metric_names)
+        rows = [dict(run_id=run_id, metric=m, **metric_aggregates(details[m])) for m in metric_names]
+        self._replace_run_rows(self.aggregates_path, run_id, rows)
+
+    def write_cost_latency(self, run_id, cost_latency):
+        """Store a run's per-metric cost/latency (the summary's `cost_latency` section)"""
+        self._replace_run_rows(self.cost_latency_path, run_id,
+                               [dict(run_id=run_id, metric=m, **stats) for m, stats in cost_latency["per_metric"].items()])
+
+    def sample_costs_path(self, run_id):
+        return os.path.join(self.sample_costs_root, f"run_id={run_id}", "part-0.parquet")
+
+    def write_sample_costs(self, run_id, sample_costs):
+        """Store a run's per-sample tokens, cost and latency ({sample_id: stats})"""
+        _atomic_write_table(sample_costs_table(sample_costs, run_id), self.sample_costs_path(run_id))
+
+    def sample_costs_writer(self, run_id):
+        """ParquetWriter for streaming a run's per-sample costs batch by batch (see sample_costs_table)"""
+        self.check_new_run(run_id)
+        path = self.sample_costs_path(run_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return pq.ParquetWriter(path, SAMPLE_COST_SCHEMA)
+
+    def _replace_run_rows(self, path, run_id, rows):
+        """Swap one run's rows in a small per-run table"""
+        with self._lock:
+            table = pq.read_table(path).to_pandas() if os.path.exists(path) else pd.DataFrame()
+            if not table.empty:
+                table = table[table["run_id"] != run_id]
+            table = pd.concat([table, pd.DataFrame(rows)], ignore_index=True)
+            _atomic_write_table(pa.Table.from_pandas(table, preserve_index=False), path)
+
+    def run_dir(self, run_id):
+        return os.path.join(self.details_root, f"run_id={run_id}")
+
+    def details_writer(self, run_id, metric_names):
+        """ParquetWriter for streaming a run's detail rows batch by batch"""
+        # Opening the writer truncates the partition: refuse before a recorded run loses its rows
+        self.check_new_run(run_id)
+        directory = self.run_dir(run_id)
+        os.makedirs(directory, exist_ok=True)
+        return pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), detail_schema(metric_names))
+
+    def write_details(self, run_id, rows, metric_names):
+        """Write all detail rows of a run in one go"""
+        _atomic_write_table(details_table(rows, metric_names, run_id), os.path.join(self.run_dir(run_id), "part-0.parquet"))
+
+    def record_run(self, summary, rows, metric_names, sample_costs=None):
+        """Duplicate check, details (and per-sample costs), then the history row, so history never points at a missing run"""
+        with self._lock:
+            self.check_new_run(summary["run_id"])
+            self.write_details(summary["run_id"], rows, metric_names)
+            if sample_costs:
+                self.write_sample_costs(summary["run_id"], sample_costs)
+            self.append_run(summary)
+
+    # -- reads ----------------------------------------------------------
+
+    def history(self, columns=None):
+        """Run history sorted by timestamp (empty DataFrame if nothing is stored yet)"""
+        if not os.path.exists(self.history_path):
+            return pd.DataFrame()
+        if columns is not None:
+            available = pq.read_schema(self.history_path).names
+            columns = [c for c in columns if c in available]
+        return pq.read_table(self.history_path, columns=columns).to_pandas().sort_values("timestamp", kind="stable", ignore_index=True)
+
+    def aggregates(self, run_id=None):
+        """Per-(run, metric) statistics; filtered to one run if given"""
+        return self._run_rows(self.aggregates_path, run_id)
+
+    def cost_latency(self, run_id=None):
+        """Per-(run, metric) latency, tokens and cost; filtered to one run if given"""
+        return self._run_rows(self.cost_latency_path, run_id)
+
+    def sample_costs(self, run_id):
+        """Per-sample tokens, cost and latency of one run"""
+        path = self.sample_costs_path(run_id)
+        if os.path.exists(path):
+            return pq.read_table(path).to_pandas()
+        return self._run_rows(self.legacy_sample_costs_path, run_id)
+
+    def _run_rows(self, path, run_id=None):
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        filters = [("run_id", "==", run_id)] if run_id is not None else None
+        return pq.read_table(path, filters=filters).to_pandas()
+
+    def run_ids(self):
+        return self.history(columns=["run_id", "timestamp"])["run_id"].tolist() if os.path.exists(self.history_path) else []
+
+    def has_details(self, run_id):
+        return os.path.isdir(self.run_dir(run_id))
+
+    def details_stamp(self, run_id):
+        """Latest mtime (ns) of a run's detail files, 0 if there are none"""
+        files = glob.glob(os.path.join(self.run_dir(run_id), "*.parquet"))
+        return max((os.stat(f).st_mtime_ns for f in files), default=0)
+
+    def history_stamp(self):
+        return os.stat(self.history_path).st_mtime_ns if os.path.exists(self.history_path) else 0
+
+    def detail_columns(self, run_id):
+        files = sorted(glob.glob(os.path.join(self.run_dir(run_id), "*.parquet")))
+        return pq.read_schema(files[0]).names if files else []
+
+    def sample_rows(self, run_id, sample_ids, columns=None):
+        """Rows of one run for the given sample IDs; row groups are pruned via the sample_id statistics"""
+        files = sorted(glob.glob(os.path.join(self.run_dir(run_id), "*.parquet")))
+        if not files:
+            return pd.DataFrame()
+        filters = [("sample_id", "in", list(sample_ids))]
+        tables = [pq.read_table(f, columns=columns, filters=filters) for f in files]
+        return pa.concat_tables(tables).to_pandas()
+
+    def details(self, run_id, columns=None):
+        """Per-sample rows of one run, reading only `columns` if given"""
+        directory = self.run_dir(run_id)
+        if not os.path.isdir(directory):
+            return pd.DataFrame()
+        files = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+        if columns is not None:
+            available = pq.read_schema(files[0]).names
+            columns = [c for c in columns if c in available]
+        tables = [pq.read_table(f, columns=columns) for f in files]
+        return pa.concat_tables(tables).to_pandas()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_results_store():
+    """Process-wide store rooted at results/store/"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ResultsStore()
+        return _default_store
+
+
+def _index_summary(summary):
+    """Summary as kept in the index: without per-sample costs, which older summaries embed"""
+    cost_latency = summary.get("cost_latency") if isinstance(summary, dict) else None
+    if isinstance(cost_latency, dict) and "per_sample" in cost_latency:
+        summary = dict(summary, cost_latency={k: v for k, v in cost_latency.items() if k != "per_sample"})
+    return summary
+
+
+class SummaryIndex:
+    """Persistent mtime index over results/*_summary.json.
+
+    ``refresh()`` stats the directory and parses only summaries that are new
+    or whose (mtime, size) changed since the last refresh; deleted files drop
+    out. ``version`` changes exactly when the indexed content changes, so it
+    can key a cache of the history frame.
+    """
+
+    SUFFIX = "_summary.json"
+
+    def __init__(self, results_dir=RESULTS_DIR, path=None):
+        self.results_dir = results_dir
+        self.path = path or os.path.join(results_dir, "store", "summary_index.json")
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}
+            for entry in self.entries.values():
+                entry["summary"] = _index_summary(entry["summary"])
+
+    @property
+    def version(self):
+        stamps = sorted((name, e["mtime_ns"], e["size"]) for name, e in self.entries.items())
+        return hashlib.sha1(json.dumps(stamps).encode("utf-8")).hexdigest()[:16]
+
+    def refresh(self):
+        """Ingest new/modified summaries; returns the number of files parsed"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        seen = {}
+        parsed = 0
+        if os.path.isdir(self.results_dir):
+            with os.scandir(self.results_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                        stat = entry.stat()
+                        seen[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = set(self.entries) - set(seen)
+        for name in changed:
+            del self.entries[name]
+        for name, (mtime_ns, size) in seen.items():
+            cached = self.entries.get(name)
+            if cached is not None and cached["mtime_ns"] == mtime_ns and cached["size"] == size:
+                continue
+            try:
+                with open(os.path.join(self.results_dir, name), "r") as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                # Half-written or corrupt; retried when its mtime changes
+                summary = None
+            self.entries[name] = {"mtime_ns": mtime_ns, "size": size, "summary": _index_summary(summary)}
+            changed.add(name)
+            parsed += 1
+
+        if changed:
+            self.save()
+        return parsed
+
+    def summaries(self):
+        with self._lock:
+            return [e["summary"] for e in self.entries.values() if e["summary"]]
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+
+def _parse_list(value):
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+    return value
+
+
+def import_legacy(results_dir=RESULTS_DIR, store=None):
+    """Load *_summary.json / *_details.csv runs that are not in the store yet"""
+    store = store or ResultsStore(os.path.join(results_dir, "store"))
+    known = set(store.run_ids())
+    summaries = []
+    for path in glob.glob(os.path.join(results_dir, "*_summary.json")):
+        try:
+            with open(path, "r") as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    imported = 0
+    for summary in sorted(summaries, key=lambda s: s.get("timestamp", "")):
+        run_id = summary.get("run_id")
+        if not run_id or run_id in known:
+            continue
+        csv_path = os.path.join(results_dir, f"{run_id}_details.csv")
+        if os.path.exists(csv_path):
+            df = pd.read_csv(csv_path)
+            metric_names = [c for c in summary if c not in HISTORY_KEYS and c in df.columns]
+            for column in ("user_input", "retrieved_contexts", "reference_contexts", "reference_topics"):
+                if column in df.columns:
+                    df[column] = df[column].map(_parse_list)
+            store.write_details(run_id, df.to_dict("records"), metric_names)
+        store.append_run(summary)
+        known.add(run_id)
+        imported += 1
+    return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the columnar results store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import-legacy", help="Import results/*_summary.json and *_details.csv runs")
+    sub.add_parser("history", help="Print the run history table")
+    args = parser.parse_args(argv)
+
+    if args.command == "import-legacy":
+        print(f"📥 Imported {import_legacy()} runs into {get_results_store().root}")
+    elif args.command == "history":
+        print(get_results_store().history().to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
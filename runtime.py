@@ -0,0 +1,99 @@
+import inspect
+import threading
+
+from llm_cache import get_default_cache
+from rate_limiter import get_default_limiters
+from rag_client import get_rag_client
+from llm_clients import get_api_key, build_http_client, build_async_http_client, uses_local_openai, JUDGE_MODEL, EMBEDDING_MODEL
+
+
+class EvalRuntime:
+    """Everything a test session shares: one pooled OpenAI connection pool behind
+    the judge cache and rate limiter, the RAG client, and memoized judge LLMs,
+    embeddings and metric instances.
+
+    Build one per session and close it at the end; the async pool is bound to
+    the event loop that first uses it, so tests must share that loop too.
+    """
+
+    def __init__(self, api_key=None, cache=None, limiters=None, rag=None):
+        self.api_key = api_key or get_api_key()
+        self.cache = cache or get_default_cache()
+        self.limiters = limiters or get_default_limiters()
+        self.rag = rag or get_rag_client()
+        self._http_client = None
+        self._sync_http_client = None
+        self._client = None
+        self._llms = {}
+        self._embeddings = {}
+        self._metrics = {}
+        self._lock = threading.RLock()
+
+    @property
+    def http_client(self):
+        """The pooled async httpx client (cache -> limiter -> network) every async caller shares"""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = build_async_http_client(self.cache, self.limiters)
+            return self._http_client
+
+    @property
+    def client(self):
+        """The session's AsyncOpenAI client, created on first use"""
+        with self._lock:
+            if self._client is None:
+                from openai import AsyncOpenAI
+                self._client = AsyncOpenAI(api_key=self.api_key, http_client=self.http_client)
+            return self._client
+
+    def llm(self, model=JUDGE_MODEL):
+        """ragas judge LLM for `model`, built once"""
+        with self._lock:
+            if model not in self._llms:
+                from ragas.llms import llm_factory
+                self._llms[model] = llm_factory(model, client=self.client)
+            return self._llms[model]
+
+    def embeddings(self, model=EMBEDDING_MODEL):
+        """Embeddings for `model` behind the on-disk vector store, built once.
+
+        Like run_eval, this is LangChain's client: sync calls from the legacy
+        metrics then use a sync pool instead of a private event loop, which
+        would leave connections in the shared async pool bound to a dead loop.
+        """
+        with self._lock:
+            if model not in self._embeddings:
+                from langchain_openai import OpenAIEmbeddings
+                from embedding_cache import cached_embeddings
+                if self._sync_http_client is None:
+                    self._sync_http_client = build_http_client(self.cache, self.limiters)
+                self._embeddings[model] = cached_embeddings(OpenAIEmbeddings(
+                    model=model, api_key=self.api_key, check_embedding_ctx_length=not uses_local_openai(),
+                    http_client=self._sync_http_client, http_async_client=self.http_client))
+            return self._embeddings[model]
+
+    def metric(self, metric_cls, **kwargs):
+        """Shared instance of `metric_cls` configured with `kwargs`.
+
+        The session judge and embeddings are filled in for ``llm`` and
+        ``embeddings`` unless given, so tests asking for the same metric and
+        settings get the same object.
+        """
+        key = (metric_cls, repr(sorted(kwargs.items())))
+        with self._lock:
+            if key not in self._metrics:
+                params = inspect.signature(metric_cls).parameters
+                if "llm" in params:
+                    kwargs.setdefault("llm", self.llm())
+                if "embeddings" in params:
+                    kwargs.setdefault("embeddings", self.embeddings())
+                self._metrics[key] = metric_cls(**kwargs)
+            return self._metrics[key]
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = self._client = None
+        if self._sync_http_client is not None:
+            self._sync_http_client.close()
+            self._sync_http_client = None
@@ -0,0 +1,79 @@
+"""Pytest plugin: split the suite across pytest-xdist workers without duplicate network calls.
+
+    pytest -n auto
+
+- Every batch_score test is put in an ``xdist_group`` named after its sample
+  parameter and ``-n`` defaults to ``--dist loadgroup``, so identical samples
+  from different modules land on the same worker and are scored once there.
+- RAG answers go through one SQLite file all workers share for the run
+  (RAG_SHARED_CACHE, see rag_client.SharedAnswerCache), so a question asked
+  by several tests (Test1 and Test2 ask the same one) hits the endpoint once.
+- Judge verdicts and embeddings already live in the on-disk caches under
+  RAGAS_CACHE_DIR, which are safe to share between processes.
+
+Without xdist the same RAG cache still dedupes questions within the run.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+import pytest
+
+from batch_scoring import sample_param
+
+SHARED_CACHE_PATH = pytest.StashKey[str]()
+OWNED_CACHE_DIR = pytest.StashKey[str]()
+
+
+def sample_group(item):
+    """xdist group shared by every test built from the same parameter"""
+    param = json.dumps(sample_param(item), sort_keys=True, default=str)
+    return "sample-" + hashlib.sha1(param.encode("utf-8")).hexdigest()[:12]
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_cmdline_main(config):
+    # Runs before xdist turns a bare -n into --dist load
+    if getattr(config.option, "numprocesses", None) and config.option.dist == "no":
+        config.option.dist = "loadgroup"
+
+
+def pytest_configure(config):
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        path = workerinput.get("rag_shared_cache")
+    else:
+        path = os.getenv("RAG_SHARED_CACHE")
+        if not path:
+            # One fresh file per run: answers are shared, never reused by the next run
+            tmp = tempfile.mkdtemp(prefix="rag_shared_")
+            config.stash[OWNED_CACHE_DIR] = tmp
+            path = os.path.join(tmp, "answers.sqlite")
+    if path:
+        os.environ["RAG_SHARED_CACHE"] = path
+        config.stash[SHARED_CACHE_PATH] = path
+
+
+def pytest_unconfigure(config):
+    tmp = config.stash.get(OWNED_CACHE_DIR, None)
+    if tmp:
+        os.environ.pop("RAG_SHARED_CACHE", None)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    """Hand the controller's RAG cache path to each xdist worker"""
+    path = node.config.stash.get(SHARED_CACHE_PATH, None)
+    if path:
+        node.workerinput["rag_shared_cache"] = path
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(items):
+    # Before xdist's worker hook, which reads the group into the node id
+    for item in items:
+        if item.get_closest_marker("batch_score") and not item.get_closest_marker("xdist_group"):
+            item.add_marker(pytest.mark.xdist_group(sample_group(item)))
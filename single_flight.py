@@ -0,0 +1,197 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future, CancelledError
+
+import httpx
+
+from llm_cache import CACHEABLE_PATHS, request_cache_key
+
+# Embedding requests are coalesced too; their vectors are cached by embedding_cache, not the judge cache
+COALESCE_PATHS = CACHEABLE_PATHS + ("/embeddings",)
+
+# Headers describing the original wire encoding; the shared body is already decoded
+_WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def single_flight_enabled():
+    """Coalescing is on unless RAGAS_SINGLE_FLIGHT is set to 0/off/false"""
+    return os.getenv("RAGAS_SINGLE_FLIGHT", "on").lower() not in ("0", "off", "false", "no")
+
+
+class SingleFlight:
+    """Merges identical outstanding calls into one.
+
+    The first caller for a key runs the work; callers arriving while it is
+    in flight wait for its result (or exception) instead of repeating it.
+    Nothing is kept once the call finishes, that is the caches' job.
+
+    Flights are plain concurrent futures, so async callers can wait on a
+    flight started on another thread or event loop. Sync callers block
+    while waiting: give sync and async code separate instances, otherwise
+    a sync call on an event loop thread could wait on a task that loop
+    never gets to run.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, keys):
+        """({key: future} we must fill, {key: future} someone else is filling)"""
+        own, others = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in own or key in others:
+                    continue
+                if key in self._flights:
+                    others[key] = self._flights[key]
+                    self.shared += 1
+                else:
+                    own[key] = self._flights[key] = Future()
+                    self.calls += 1
+        return own, others
+
+    def _settle(self, own, results=None, error=None):
+        with self._lock:
+            for key in own:
+                self._flights.pop(key, None)
+        for key, future in own.items():
+            if error is not None and not isinstance(error, Exception):
+                # Cancelled or interrupted: waiters retry rather than inherit it
+                future.cancel()
+            elif error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[key])
+
+    def many(self, keys, fn):
+        """Results for `keys`, calling ``fn(missing_keys) -> list`` only for keys nobody is fetching"""
+        while True:
+            own, others = self._join(keys)
+            results = {}
+            if own:
+                try:
+                    results = dict(zip(own, fn(list(own))))
+                except BaseException as e:
+                    self._settle(own, error=e)
+                    raise
+                self._settle(own, results)
+            try:
+                results.update({key: future.result() for key, future in others.items()})
+            except CancelledError:
+                # The owner gave up; take over its keys
+                continue
+            return [results[key] for key in keys]
+
+    async def amany(self, keys, fn):
+        """Async `many`; ``fn`` is a coroutine function"""
+        while True:
+            own, others = self._join(keys)
+            results = {}
+            if own:
+                try:
+                    results = dict(zip(own, await fn(list(own))))
+                except BaseException as e:
+                    self._settle(own, error=e)
+                    raise
+                self._settle(own, results)
+            try:
+                for key, future in others.items():
+                    # shield: our own cancellation must not cancel the owner's flight
+                    results[key] = await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not any(future.cancelled() for future in others.values()):
+                    raise
+                continue
+            return [results[key] for key in keys]
+
+    def do(self, key, fn):
+        """Result of ``fn()``, shared with concurrent callers for the same key"""
+        return self.many([key], lambda keys: [fn()])[0]
+
+    async def ado(self, key, fn):
+        async def call(keys):
+            return [await fn()]
+        return (await self.amany([key], call))[0]
+
+    def stats(self):
+        return {"calls": self.calls, "shared": self.shared}
+
+
+def _flight_key(request):
+    keyed = request_cache_key(request, COALESCE_PATHS)
+    return keyed[0] if keyed else None
+
+
+def _snapshot(response, body):
+    headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _WIRE_HEADERS]
+    return response.status_code, headers, body
+
+
+def _response(request, snapshot, shared=False):
+    status, headers, body = snapshot
+    if shared:
+        # Lets telemetry tell a merged call from the one that was actually sent
+        headers = headers + [("x-ragas-single-flight", "shared")]
+    return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+class SingleFlightTransport(httpx.BaseTransport):
+    """httpx transport that sends identical concurrent completion/embedding requests once"""
+
+    def __init__(self, transport=None, flight=None):
+        self.transport = transport or httpx.HTTPTransport()
+        self.flight = flight or SingleFlight()
+
+    def _send(self, request):
+        response = self.transport.handle_request(request)
+        body = response.read()
+        response.close()
+        return _snapshot(response, body)
+
+    def handle_request(self, request):
+        key = _flight_key(request)
+        if key is None:
+            return self.transport.handle_request(request)
+        sent = []
+
+        def send():
+            sent.append(True)
+            return self._send(request)
+
+        return _response(request, self.flight.do(key, send), shared=not sent)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncSingleFlightTransport(httpx.AsyncBaseTransport):
+    """Async variant of SingleFlightTransport"""
+
+    def __init__(self, transport=None, flight=None):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.flight = flight or SingleFlight()
+
+    async def _send(self, request):
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        return _snapshot(response, body)
+
+    async def handle_async_request(self, request):
+        key = _flight_key(request)
+        if key is None:
+            return await self.transport.handle_async_request(request)
+        sent = []
+
+        async def send():
+            sent.append(True)
+            return await self._send(request)
+
+        return _response(request, await self.flight.ado(key, send), shared=not sent)
+
+    async def aclose(self):
+        await self.transport.aclose()
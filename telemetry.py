@@ -0,0 +1,287 @@
+import os
+import json
+import math
+import time
+import functools
+import contextvars
+
+import httpx
+
+from llm_cache import request_cache_key
+from single_flight import COALESCE_PATHS
+
+# USD per 1M tokens as (prompt, completion); override with RAGAS_PRICES='{"model": [in, out]}'
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+# Counters kept per (sample, metric) job. cache_hits/cache_misses count requests;
+# embedding_store_hits counts vectors the embedding store served without a request
+COUNTERS = ("llm_calls", "embedding_calls", "prompt_tokens", "completion_tokens", "retries", "cache_hits", "cache_misses",
+            "embedding_store_hits")
+
+_current_job = contextvars.ContextVar("ragas_job", default=None)
+
+
+@functools.lru_cache(maxsize=None)
+def _price_table(overrides):
+    """MODEL_PRICES plus a RAGAS_PRICES value, parsed once per distinct value"""
+    prices = dict(MODEL_PRICES)
+    if overrides:
+        try:
+            prices.update({k: (float(v[0]), float(v[1])) for k, v in json.loads(overrides).items()})
+        except (ValueError, TypeError, AttributeError, IndexError, KeyError) as e:
+            print(f"⚠️ Ignoring invalid RAGAS_PRICES ({e}); using the built-in MODEL_PRICES")
+            return dict(MODEL_PRICES)
+    return prices
+
+
+def model_price(model):
+    """(prompt, completion) USD per 1M tokens; dated snapshots fall back to their base model"""
+    prices = _price_table(os.getenv("RAGAS_PRICES", ""))
+    for name in sorted(prices, key=len, reverse=True):
+        if model == name or model.startswith(name + "-"):
+            return prices[name]
+    return (0.0, 0.0)
+
+
+class JobStats:
+    """What one (sample, metric) scoring job spent.
+
+    Set as the current job while the metric runs; every judge/embedding
+    request made in that task (or threads started with ``asyncio.to_thread``)
+    is added to it by the instrumented transports.
+    """
+
+    def __init__(self, metric, row=None, reused=False):
+        self.metric = metric
+        self.row = row
+        # Score taken from the manifest: the job never ran and spent nothing
+        self.reused = reused
+        self.latency = 0.0
+        self.cost = 0.0
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self._start = None
+
+    def __enter__(self):
+        self._token = _current_job.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.latency = time.perf_counter() - self._start
+        _current_job.reset(self._token)
+
+    def record(self, kind, model, usage, retried, cached):
+        prompt = usage.get("prompt_tokens", 0) or 0
+        completion = usage.get("completion_tokens", 0) or 0
+        setattr(self, f"{kind}_calls", getattr(self, f"{kind}_calls") + 1)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.retries += int(retried)
+        if cached:
+            # Served without spending: judge cache hit or merged into another caller's request
+            self.cache_hits += 1
+            return
+        self.cache_misses += 1
+        price_in, price_out = model_price(model)
+        self.cost += (prompt * price_in + completion * price_out) / 1e6
+
+    def as_dict(self):
+        return dict(metric=self.metric, row=self.row, reused=int(self.reused), latency=self.latency, cost=self.cost,
+                    **{name: getattr(self, name) for name in COUNTERS})
+
+
+def current_job():
+    return _current_job.get()
+
+
+def _usage(response):
+    try:
+        return json.loads(response.content).get("usage") or {}
+    except (ValueError, AttributeError):
+        return {}
+
+
+def _record(job, request, model, response):
+    job.record(
+        "embedding" if request.url.path.endswith("/embeddings") else "llm",
+        model,
+        _usage(response) if response.status_code == 200 else {},
+        retried=request.headers.get("x-stainless-retry-count", "0") not in ("", "0"),
+        cached=response.headers.get("x-ragas-cache") == "hit" or response.headers.get("x-ragas-single-flight") == "shared",
+    )
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """httpx transport that charges each completion/embedding request to the current JobStats"""
+
+    def __init__(self, transport=None):
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        job = _current_job.get()
+        keyed = request_cache_key(request, COALESCE_PATHS) if job is not None else None
+        response = self.transport.handle_request(request)
+        if keyed is not None:
+            response.read()
+            _record(job, request, keyed[1], response)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Async variant of InstrumentedTransport"""
+
+    def __init__(self, transport=None):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        job = _current_job.get()
+        keyed = request_cache_key(request, COALESCE_PATHS) if job is not None else None
+        response = await self.transport.handle_async_request(request)
+        if keyed is not None:
+            await response.aread()
+            _record(job, request, keyed[1], response)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class LatencySketch:
+    """Streaming quantiles of non-negative values, within about 1% relative error.
+
+    Values are counted in logarithmic buckets, so memory depends on the
+    spread of the values (a few hundred buckets from 1ms to minutes), not
+    on how many were added.
+    """
+
+    GAMMA = 1.02
+    # Anything faster is counted as zero
+    MIN_VALUE = 1e-6
+
+    def __init__(self):
+        self.count = 0
+        self.zeros = 0
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        if value < self.MIN_VALUE:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value, self.GAMMA))
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def _value(self, index):
+        """Estimate of the `index`-th smallest value"""
+        seen = self.zeros
+        if index < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if index < seen:
+                # Bucket `key` holds (GAMMA**(key-1), GAMMA**key]; report its midpoint
+                return 2 * self.GAMMA ** key / (self.GAMMA + 1)
+
+    def quantile(self, q):
+        """Approximate `q`-quantile (0..1) of the added values, None if there are none.
+
+        Interpolates between neighbouring ranks like ``numpy.percentile``.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        low = math.floor(rank)
+        lower, upper = self._value(low), self._value(min(low + 1, self.count - 1))
+        return lower + (upper - lower) * (rank - low)
+
+
+def _empty_totals():
+    return dict(jobs=0, reused=0, **dict.fromkeys(COUNTERS, 0), cost_usd=0.0, latency_s=0.0)
+
+
+def _fold(totals, job):
+    if job.get("reused"):
+        totals["reused"] += 1
+    else:
+        totals["jobs"] += 1
+    for name in COUNTERS:
+        totals[name] += int(job.get(name, 0))
+    totals["cost_usd"] += float(job["cost"])
+    totals["latency_s"] += float(job["latency"])
+
+
+class CostAccumulator:
+    """Running cost/latency of JobStats dicts (with a ``sample_id``), fed a batch at a time.
+
+    Only per-metric counters and latency sketches are kept, so memory does
+    not grow with the number of jobs. ``add`` returns the batch's
+    per-sample costs for the caller to store.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._total = _empty_totals()
+
+    def add(self, jobs):
+        """Fold `jobs` in; returns {sample_id: tokens, cost and summed latency} for them"""
+        per_sample = {}
+        for job in jobs:
+            totals, sketch = self._metrics.setdefault(job["metric"], (_empty_totals(), LatencySketch()))
+            _fold(totals, job)
+            _fold(self._total, job)
+            if not job.get("reused"):
+                sketch.add(job["latency"])
+            sample = per_sample.setdefault(job["sample_id"], dict(prompt_tokens=0, completion_tokens=0,
+                                                                  cost_usd=0.0, latency_s=0.0))
+            sample["prompt_tokens"] += int(job.get("prompt_tokens", 0))
+            sample["completion_tokens"] += int(job.get("completion_tokens", 0))
+            sample["cost_usd"] += float(job["cost"])
+            sample["latency_s"] += float(job["latency"])
+        return per_sample
+
+    def summary(self):
+        """The summary's `cost_latency` section: per-metric rows and run totals"""
+        per_metric = {}
+        for metric, (totals, sketch) in self._metrics.items():
+            per_metric[metric] = dict(jobs=totals["jobs"], reused=totals["reused"],
+                                      p50_latency_s=sketch.quantile(0.50), p95_latency_s=sketch.quantile(0.95),
+                                      **{k: v for k, v in totals.items() if k not in ("jobs", "reused")})
+        total = dict(self._total)
+        served = total["cache_hits"] + total["cache_misses"]
+        total["cache_hit_rate"] = total["cache_hits"] / served if served else None
+        return {"per_metric": per_metric, "total": total}
+
+
+def summarize(jobs):
+    """Per-metric, per-sample and overall cost/latency from JobStats dicts with a ``sample_id``.
+
+    Per metric: scored and reused job counts, p50/p95 latency of the scored
+    jobs (None if every score was reused, see LatencySketch for accuracy)
+    and the summed counters.
+    Per sample: tokens, cost and the summed latency of its jobs.
+    """
+    costs = CostAccumulator()
+    per_sample = costs.add(jobs)
+    return dict(costs.summary(), per_sample=per_sample)
+
+
+def spend_line(cost_latency):
+    """One-line report of a `cost_latency` section"""
+    total = cost_latency["total"]
+    timed = [kv for kv in cost_latency["per_metric"].items() if kv[1]["p95_latency_s"] is not None]
+    slowest = max(timed, key=lambda kv: kv[1]["p95_latency_s"], default=None)
+    return (f"💸 Judge spend: ${total['cost_usd']:.4f} for {total['prompt_tokens']} prompt + "
+            f"{total['completion_tokens']} completion tokens ({total['cache_hits']} cache hits, "
+            f"{total['reused']} reused scores)"
+            + (f", slowest metric {slowest[0]} (p95 {slowest[1]['p95_latency_s']:.2f}s)" if slowest else ""))
@@ -1,11 +1,5 @@
 import os
 import pytest
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredWordDocumentLoader
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from ragas.embeddings import LangchainEmbeddingsWrapper
-from ragas.llms import LangchainLLMWrapper
-from ragas.testset import TestsetGenerator
-import nltk
 
 # Ensure tokens are set
 if not os.getenv("OPENAI_API_KEY"):
@@ -14,12 +8,14 @@ if not os.getenv("OPENAI_API_KEY"):
     # Leaving strict check to ensure user sets it.
     pass
 
-# Ensure NLTK data is available
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('punkt_tab')
+def ensure_nltk_data():
+    """Download the NLTK tokenizers on first use rather than at import time"""
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+        nltk.download('punkt_tab')
 
 # Setup paths
 # User's path: /Users/rahulshetty/documents/fs11/
@@ -27,35 +23,38 @@ except LookupError:
 base_dir = os.path.dirname(os.path.abspath(__file__))
 fs11_path = os.path.join(base_dir, "fs11")
 
-def test_dataGen():
-    llm = ChatOpenAI(model="gpt-4o", temperature=0)
+def generate_testset(size=20, rebuild=False):
+    # Heavy imports live here so importing or collecting this module stays cheap
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from ragas.embeddings import LangchainEmbeddingsWrapper
+    from ragas.llms import LangchainLLMWrapper
+    from ragas.testset import TestsetGenerator
+    from embedding_cache import cached_embeddings
+    from doc_cache import load_documents
+    from testset_graph import update_knowledge_graph
+    from llm_clients import build_http_client, build_async_http_client
+
+    ensure_nltk_data()
+    # Both clients share the process-wide OpenAI rate limiter
+    http_clients = {"http_client": build_http_client(), "http_async_client": build_async_http_client()}
+    llm = ChatOpenAI(model="gpt-4o", temperature=0, **http_clients)
     langchain_llm = LangchainLLMWrapper(llm)
-    embed = OpenAIEmbeddings()
-    
-    loader = DirectoryLoader(
-        path=fs11_path,
-        glob="**/*.docx",
-        loader_cls=UnstructuredWordDocumentLoader
-    )
+    embed = OpenAIEmbeddings(**http_clients)
     
     print(f"Loading documents from {fs11_path}...")
-    docs = loader.load()
+    # Unchanged files are served from the parsed-document cache; the rest parse in parallel
+    docs = load_documents(fs11_path, "**/*.docx")
     print(f"Loaded {len(docs)} documents.")
     
-    generate_embeddings = LangchainEmbeddingsWrapper(embed)
+    # Chunks of an unchanged corpus are served from the on-disk embedding store
+    generate_embeddings = LangchainEmbeddingsWrapper(cached_embeddings(embed))
     generator = TestsetGenerator(llm=langchain_llm, embedding_model=generate_embeddings)
     
-    import sys
-    # Read size from args if provided
-    size = 20
-    if len(sys.argv) > 1:
-        try:
-            size = int(sys.argv[1])
-        except:
-            pass
-            
+    # Only new or changed documents go through extraction; the graph is kept in .cache/
+    generator.knowledge_graph = update_knowledge_graph(docs, langchain_llm, generate_embeddings, rebuild=rebuild)
+
     print(f"Generating testset (size={size})...")
-    dataset = generator.generate_with_langchain_docs(docs, testset_size=size)
+    dataset = generator.generate(testset_size=size)
     
     # Save to file instead of just printing
     output_path = os.path.join(base_dir, "testdata", "generated_testset.json")
@@ -65,5 +64,18 @@ def test_dataGen():
     # print(dataset.to_list())
     # dataset.upload() # Uncomment if RAGAS_APP_TOKEN is set and upload is desired
 
+
+def test_dataGen():
+    import sys
+    # Read size from args if provided
+    size = 20
+    if len(sys.argv) > 1:
+        try:
+            size = int(sys.argv[1])
+        except:
+            pass
+    # --rebuild discards the persisted knowledge graph
+    generate_testset(size, rebuild="--rebuild" in sys.argv)
+
 if __name__ == "__main__":
     test_dataGen()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from local_servers import LocalStack
+from rag_client import AsyncRagClient, RagClient, CircuitBreaker, RetryPolicy, RagEndpointError
+
+RESET_TIMEOUT = 0.3
+
+
+def half_open_breaker():
+    """A breaker whose next allowed call is the half-open probe"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=RESET_TIMEOUT)
+    breaker.record_failure()
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.state == "half-open"
+    return breaker
+
+
+class _NotJsonHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        body = b"<html>maintenance</html>"
+        self.send_response(200)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def not_json_endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _NotJsonHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/ask"
+    server.shutdown()
+    server.server_close()
+
+
+def test_cancelled_probe_releases_breaker():
+    breaker = half_open_breaker()
+    with LocalStack(latency_ms=500) as stack:
+        async def probe():
+            async with AsyncRagClient(endpoint=stack.rag_endpoint, breaker=breaker) as client:
+                await asyncio.wait_for(client.ask("How many articles are there?"), 0.1)
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(probe())
+        # The cancelled probe counts as a failure: the circuit re-opens instead of staying claimed
+        assert breaker.state == "open"
+
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.allow()
+
+
+def test_invalid_json_probe_releases_breaker(not_json_endpoint):
+    breaker = half_open_breaker()
+    client = RagClient(endpoint=not_json_endpoint, breaker=breaker, retry=RetryPolicy(attempts=1))
+    with pytest.raises(RagEndpointError):
+        client.ask("How many articles are there?")
+    client.close()
+
+    assert breaker.state == "open"
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.allow()
@@ -0,0 +1,35 @@
+import pytest
+
+from results_store import ResultsStore
+
+
+def _summary(run_id, score):
+    return {"run_id": run_id, "timestamp": "2026-01-01T00:00:00", "total_samples": 1, "faithfulness": score}
+
+
+def _rows(answer, score):
+    return [{"sample_id": "s1", "sample_type": "single_turn", "user_input": "q", "response": answer, "faithfulness": score}]
+
+
+def test_duplicate_run_keeps_original_details(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.record_run(_summary("r1", 0.5), _rows("original", 0.5), ["faithfulness"])
+
+    with pytest.raises(ValueError):
+        store.record_run(_summary("r1", 0.9), _rows("other", 0.9), ["faithfulness"])
+
+    details = store.details("r1")
+    assert details["response"].tolist() == ["original"]
+    assert details["faithfulness"].tolist() == [0.5]
+    assert store.history()["faithfulness"].tolist() == [0.5]
+    assert store.aggregates("r1").set_index("metric").loc["faithfulness", "mean"] == 0.5
+
+
+def test_duplicate_streamed_run_keeps_original_details(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.record_run(_summary("r1", 0.5), _rows("original", 0.5), ["faithfulness"])
+
+    with pytest.raises(ValueError):
+        store.details_writer("r1", ["faithfulness"])
+
+    assert store.details("r1")["response"].tolist() == ["original"]
@@ -0,0 +1,25 @@
+from ragas.testset.graph import KnowledgeGraph, Node, NodeType, Relationship
+
+from testset_graph import DOC_HASH, _tag_documents
+
+
+def test_hash_reaches_chunks_of_chunks():
+    document = Node(type=NodeType.DOCUMENT, properties={"page_content": "doc", DOC_HASH: "h1"})
+    section = Node(type=NodeType.CHUNK, properties={"page_content": "section"})
+    chunk = Node(type=NodeType.CHUNK, properties={"page_content": "chunk"})
+    other = Node(type=NodeType.CHUNK, properties={"page_content": "unrelated"})
+    kg = KnowledgeGraph(
+        nodes=[chunk, section, document, other],
+        # Deepest split first: a single pass over the edges would miss the chunk
+        relationships=[
+            Relationship(source=section, target=chunk, type="child"),
+            Relationship(source=document, target=section, type="child"),
+            Relationship(source=section, target=other, type="next"),
+        ],
+    )
+
+    _tag_documents(kg)
+
+    assert section.properties[DOC_HASH] == "h1"
+    assert chunk.properties[DOC_HASH] == "h1"
+    assert DOC_HASH not in other.properties
@@ -0,0 +1,172 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from ragas.run_config import RunConfig
+from ragas.testset.graph import KnowledgeGraph, Node, NodeType
+from ragas.testset.transforms import default_transforms, apply_transforms
+from ragas.testset.transforms.base import RelationshipBuilder
+from ragas.testset.transforms.engine import Parallel
+
+from llm_cache import CACHE_DIR
+
+GRAPH_PATH = os.path.join(CACHE_DIR, "knowledge_graph.json")
+
+# Bump to force a full rebuild after a change in how the graph is built
+GRAPH_VERSION = 1
+
+# Node property holding the hash of the source document a node came from
+DOC_HASH = "document_hash"
+
+# Structural edges created by splitters, kept when relationships are rebuilt
+STRUCTURAL_RELATIONSHIPS = {"child", "next"}
+
+
+def document_hash(doc):
+    payload = json.dumps([doc.page_content, doc.metadata.get("source")], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_builder(step):
+    if isinstance(step, Parallel):
+        return all(_is_builder(t) for t in step.transformations)
+    return isinstance(step, RelationshipBuilder)
+
+
+def split_transforms(transforms):
+    """(per-document steps, relationship builders): extractors/splitters/filters vs. graph-wide edges"""
+    document_steps = [step for step in transforms if not _is_builder(step)]
+    builders = [step for step in transforms if _is_builder(step)]
+    return document_steps, builders
+
+
+def _signature(transforms):
+    """Class names of the transform pipeline; default_transforms picks a different one for short corpora"""
+    def names(step):
+        if isinstance(step, Parallel):
+            return [names(t) for t in step.transformations]
+        return type(step).__name__
+    return [names(step) for step in transforms]
+
+
+def _tag_documents(kg):
+    """Copy each document node's hash onto every chunk split from it, however many splits deep"""
+    children = {}
+    for rel in kg.relationships:
+        if rel.type == "child":
+            children.setdefault(rel.source.id, []).append(rel.target)
+    queue = [n for n in kg.nodes if DOC_HASH in n.properties]
+    while queue:
+        node = queue.pop()
+        for child in children.get(node.id, []):
+            if DOC_HASH not in child.properties:
+                child.properties[DOC_HASH] = node.properties[DOC_HASH]
+                queue.append(child)
+
+
+class GraphStore:
+    """A ragas KnowledgeGraph on disk plus the pipeline signature it was built with."""
+
+    def __init__(self, path=None):
+        self.path = path or GRAPH_PATH
+        self.meta_path = os.path.splitext(self.path)[0] + ".meta.json"
+
+    def load(self, signature):
+        """(graph, document hashes it covers) if built by the same pipeline, else (None, set())"""
+        if not os.path.exists(self.path) or not os.path.exists(self.meta_path):
+            return None, set()
+        with open(self.meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != GRAPH_VERSION or meta.get("transforms") != signature:
+            return None, set()
+        if meta.get("graph_sha1") != _file_sha1(self.path):
+            # Interrupted save: the meta describes a graph that never landed
+            return None, set()
+        return KnowledgeGraph.load(self.path), set(meta.get("documents", []))
+
+    def save(self, kg, signature, documents):
+        """Write graph and meta via temp files; the meta goes first and names the graph by hash"""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        graph_tmp = _temp_path(directory)
+        meta_tmp = _temp_path(directory)
+        try:
+            kg.save(graph_tmp)
+            meta = {"version": GRAPH_VERSION, "transforms": signature, "documents": sorted(documents),
+                    "graph_sha1": _file_sha1(graph_tmp)}
+            with open(meta_tmp, "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_tmp, self.meta_path)
+            os.replace(graph_tmp, self.path)
+        finally:
+            for tmp in (graph_tmp, meta_tmp):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+
+def _temp_path(directory):
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    return tmp
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def update_knowledge_graph(docs, llm, embedding_model, store=None, rebuild=False, run_config=None):
+    """Bring the persisted knowledge graph in line with ``docs`` and return it.
+
+    Nodes of removed or edited documents are dropped together with their
+    chunks; only new documents go through the LLM extractors, splitters and
+    filters. Relationship builders (similarity/overlap edges) are cheap and
+    span documents, so they are rerun over the whole graph.
+    """
+    store = store or GraphStore()
+    run_config = run_config or RunConfig()
+    transforms = default_transforms(documents=list(docs), llm=llm, embedding_model=embedding_model)
+    signature = _signature(transforms)
+    document_steps, builders = split_transforms(transforms)
+
+    kg, known = (None, set()) if rebuild else store.load(signature)
+    if kg is None:
+        kg = KnowledgeGraph()
+    wanted = {document_hash(doc): doc for doc in docs}
+
+    # 1. Drop nodes of documents that were removed or changed
+    stale = known - wanted.keys()
+    if stale:
+        dropped = {n.id for n in kg.nodes if n.properties.get(DOC_HASH) in stale}
+        kg.nodes = [n for n in kg.nodes if n.id not in dropped]
+        kg.relationships = [r for r in kg.relationships if r.source.id not in dropped and r.target.id not in dropped]
+
+    # 2. Run the per-document steps on new documents only
+    added = [h for h in wanted if h not in known]
+    if added:
+        new_kg = KnowledgeGraph(nodes=[
+            Node(type=NodeType.DOCUMENT, properties={
+                "page_content": wanted[h].page_content,
+                "document_metadata": wanted[h].metadata,
+                DOC_HASH: h,
+            })
+            for h in added
+        ])
+        apply_transforms(new_kg, document_steps, run_config=run_config)
+        _tag_documents(new_kg)
+        kg.nodes.extend(new_kg.nodes)
+        kg.relationships.extend(new_kg.relationships)
+
+    # 3. Rebuild cross-document edges over the merged graph
+    if added or stale:
+        kg.relationships = [r for r in kg.relationships if r.type in STRUCTURAL_RELATIONSHIPS]
+        apply_transforms(kg, builders, run_config=run_config)
+        store.save(kg, signature, wanted.keys())
+
+    print(f"🕸️ Knowledge graph: {len(added)} new, {len(stale)} removed/changed, "
+          f"{len(wanted) - len(added)} reused documents ({len(kg.nodes)} nodes)")
+    return kg